@@ -3,22 +3,17 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib as mpl
-import joblib
 import os
-import re
-import html
 import json
 import sys
+import hashlib
 sys.path.append("src")
 
-from bs4 import BeautifulSoup
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 from agents.analyzer import analyze_difficulty
-
-import nltk
-from nltk.corpus import stopwords
-nltk.download("stopwords", quiet=True)
-stop_words = set(stopwords.words("english"))
+from model_registry import MODEL_DIR, get_model, model_available
+from ingest import describe_frame, read_questions, read_responses
+from difficulty import DISPLAY_ORDER, compute_difficulty
 
 st.set_page_config(
     page_title="ExamIQ — Exam Question Analysis",
@@ -632,23 +627,55 @@ st.sidebar.markdown("""
 # ─── Session State ─────────────────────────────────────────────────────────
 if "questions_df" not in st.session_state:
     st.session_state.questions_df = None
-if "responses_df" not in st.session_state:
-    st.session_state.responses_df = None
-
-
-def clean_text_pipeline(text):
-    if pd.isna(text) or not isinstance(text, str):
-        return ""
-    text = html.unescape(text)
-    try:
-        text = BeautifulSoup(text, "html.parser").get_text()
-    except Exception:
-        return ""
-    text = text.lower()
-    text = re.sub(r"[^a-z\s]", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    tokens = [w for w in text.split() if w not in stop_words]
-    return " ".join(tokens).strip()
+if "responses_preview" not in st.session_state:
+    st.session_state.responses_preview = None   # responses are summarized, not kept (src/ingest.py)
+if "questions_fp" not in st.session_state:
+    st.session_state.questions_fp = None
+if "responses_fp" not in st.session_state:
+    st.session_state.responses_fp = None
+# Computed while the upload streams in (src/ingest.py)
+for _key in ("questions_summary", "questions_sketches", "questions_difficulty", "questions_dropped",
+             "responses_rows", "responses_summary", "responses_per_question", "responses_histograms",
+             "responses_dropped"):
+    if _key not in st.session_state:
+        st.session_state[_key] = None
+
+
+def upload_fingerprint(uploaded_file):
+    """Content hash of an uploaded file; identifies the data behind questions_df / responses_preview."""
+    return hashlib.sha1(uploaded_file.getvalue()).hexdigest()
+
+
+def question_difficulty():
+    """Difficulty labels of the uploaded questions (src/difficulty.py), computed once per upload."""
+    if st.session_state.questions_difficulty is None and st.session_state.questions_df is not None:
+        st.session_state.questions_difficulty = compute_difficulty(
+            st.session_state.questions_df, st.session_state.questions_sketches
+        )
+    return st.session_state.questions_difficulty
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def live_evaluation(_model, _questions_df, _difficulty, questions_fp, model_version):
+    """
+    Score the uploaded questions against their Score-quantile labels.
+
+    Cached on (questions_fp, model_version) only — the underscore arguments
+    are not hashed — so it runs once per upload and trained model.
+    """
+    has_label = _difficulty.labels.notna().to_numpy()
+    df_eval = _questions_df[has_label]
+    labels  = _difficulty.labels[has_label]
+    title = df_eval["Title"].fillna("") if "Title" in df_eval.columns else pd.Series("", index=df_eval.index)
+    body  = df_eval["Body"].fillna("") if "Body" in df_eval.columns else pd.Series("", index=df_eval.index)
+    cleaned = _model.clean(title + " " + body)
+    y_true  = labels.astype(str).to_numpy()
+    y_pred  = _model.predict(cleaned)   # vectorizes once
+    return {
+        "accuracy": accuracy_score(y_true, y_pred),
+        "report":   classification_report(y_true, y_pred, output_dict=True, zero_division=0),
+        "cm":       confusion_matrix(y_true, y_pred, labels=list(_model.classes_)),
+    }
 
 
 # ══════════════════════════════════════════════
@@ -731,8 +758,19 @@ elif page == "Upload Data":
         """, unsafe_allow_html=True)
         questions_file = st.file_uploader("Upload Questions CSV", type=["csv"], key="q_upload", label_visibility="collapsed")
         if questions_file is not None:
-            st.session_state.questions_df = pd.read_csv(questions_file, encoding="latin1", nrows=5000, on_bad_lines="skip")
+            questions_fp = upload_fingerprint(questions_file)
+            if questions_fp != st.session_state.questions_fp:
+                with st.spinner("Reading questions…"):
+                    ingested = read_questions(questions_file)
+                st.session_state.questions_df      = ingested.df
+                st.session_state.questions_summary  = describe_frame(ingested.stats, ingested.sketches)
+                st.session_state.questions_sketches = ingested.sketches
+                st.session_state.questions_difficulty = compute_difficulty(ingested.df, ingested.sketches)
+                st.session_state.questions_dropped  = ingested.dropped_columns
+                st.session_state.questions_fp      = questions_fp
             st.success(f"Loaded {len(st.session_state.questions_df):,} questions successfully")
+            if st.session_state.questions_dropped:
+                st.caption(f"Not loaded (unused by the app): {', '.join(st.session_state.questions_dropped)}")
             st.dataframe(st.session_state.questions_df.head(10), use_container_width=True)
 
     with col2:
@@ -744,17 +782,29 @@ elif page == "Upload Data":
         """, unsafe_allow_html=True)
         responses_file = st.file_uploader("Upload Responses CSV", type=["csv"], key="r_upload", label_visibility="collapsed")
         if responses_file is not None:
-            st.session_state.responses_df = pd.read_csv(responses_file, encoding="latin1", nrows=5000, on_bad_lines="skip")
-            st.success(f"Loaded {len(st.session_state.responses_df):,} responses successfully")
-            st.dataframe(st.session_state.responses_df.head(10), use_container_width=True)
+            responses_fp = upload_fingerprint(responses_file)
+            if responses_fp != st.session_state.responses_fp:
+                with st.spinner("Reading responses…"):
+                    ingested = read_responses(responses_file)
+                st.session_state.responses_preview      = ingested.preview
+                st.session_state.responses_rows         = ingested.rows
+                st.session_state.responses_summary      = describe_frame(ingested.stats, ingested.sketches)
+                st.session_state.responses_per_question = ingested.per_question
+                st.session_state.responses_histograms   = ingested.histograms
+                st.session_state.responses_dropped      = ingested.dropped_columns
+                st.session_state.responses_fp           = responses_fp
+            st.success(f"Loaded {st.session_state.responses_rows:,} responses successfully")
+            if st.session_state.responses_dropped:
+                st.caption(f"Not loaded (unused by the app): {', '.join(st.session_state.responses_dropped)}")
+            st.dataframe(st.session_state.responses_preview, use_container_width=True)
 
     st.markdown("<hr class='page-divider'/>", unsafe_allow_html=True)
     if st.session_state.questions_df is not None:
         st.markdown('<p class="section-header">Questions — Summary Statistics</p>', unsafe_allow_html=True)
-        st.dataframe(st.session_state.questions_df.describe(), use_container_width=True)
-    if st.session_state.responses_df is not None:
+        st.dataframe(st.session_state.questions_summary, use_container_width=True)
+    if st.session_state.responses_preview is not None:
         st.markdown('<p class="section-header">Responses — Summary Statistics</p>', unsafe_allow_html=True)
-        st.dataframe(st.session_state.responses_df.describe(), use_container_width=True)
+        st.dataframe(st.session_state.responses_summary, use_container_width=True)
 
 
 # ══════════════════════════════════════════════
@@ -764,38 +814,16 @@ elif page == "Difficulty Analysis":
     page_header("ML Classification", "Difficulty Analysis", "Questions classified as Easy, Medium, or Hard based on score distribution percentiles.")
 
     if st.session_state.questions_df is not None:
-        df = st.session_state.questions_df.copy()
-
-        score_col = None
-        for col in ["Score", "score", "OwnerUserId"]:
-            if col in df.columns:
-                score_col = col
-                break
-
-        if score_col and pd.api.types.is_numeric_dtype(df[score_col]):
-            q_low  = df[score_col].quantile(0.33)
-            q_high = df[score_col].quantile(0.66)
-
-            df["Difficulty"] = pd.cut(
-                df[score_col],
-                bins=[-np.inf, q_low, q_high, np.inf],
-                labels=["Hard", "Medium", "Easy"],
-            )
+        df = st.session_state.questions_df
+        difficulty = question_difficulty()
 
-            easy_count   = int((df["Difficulty"] == "Easy").sum())
-            medium_count = int((df["Difficulty"] == "Medium").sum())
-            hard_count   = int((df["Difficulty"] == "Hard").sum())
-
-            difficulty_distribution = {
-                "Easy": easy_count, "Medium": medium_count, "Hard": hard_count,
-                "total": len(df),
-                "thresholds": {"low": float(q_low), "high": float(q_high)},
-                "percentages": {
-                    "Easy":   round(easy_count   / len(df) * 100, 1),
-                    "Medium": round(medium_count  / len(df) * 100, 1),
-                    "Hard":   round(hard_count    / len(df) * 100, 1),
-                },
-            }
+        if difficulty is not None:
+            score_col = difficulty.score_col
+            easy_count   = difficulty.counts["Easy"]
+            medium_count = difficulty.counts["Medium"]
+            hard_count   = difficulty.counts["Hard"]
+
+            difficulty_distribution = difficulty.distribution()
             st.session_state.difficulty_distribution = difficulty_distribution
             problems = analyze_difficulty(difficulty_distribution)
             st.session_state.analysis_problems = problems
@@ -833,10 +861,10 @@ elif page == "Difficulty Analysis":
             st.markdown("<hr class='page-divider'/>", unsafe_allow_html=True)
             st.markdown('<p class="section-header">Difficulty Distribution</p>', unsafe_allow_html=True)
 
-            diff_counts = df["Difficulty"].value_counts()
+            diff_counts = pd.Series(difficulty.counts)
             fig, ax = plt.subplots(figsize=(7, 4))
             colors = ["#16A34A", "#CA8A04", "#DC2626"]
-            vals   = diff_counts.reindex(["Easy", "Medium", "Hard"])
+            vals   = diff_counts.reindex(DISPLAY_ORDER)
             bars   = ax.bar(vals.index, vals.values, color=colors, width=0.5, edgecolor="white", linewidth=1.5)
             for bar in bars:
                 ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 1,
@@ -855,9 +883,10 @@ elif page == "Difficulty Analysis":
             col_exp, col_down = st.columns([3, 1])
             with col_exp:
                 st.markdown('<p class="section-header">Classified Questions</p>', unsafe_allow_html=True)
-                display_cols = [c for c in ["Id", "Title", "Score", score_col, "Difficulty"] if c in df.columns]
+                display_cols = [c for c in ["Id", "Title", "Score", score_col] if c in df.columns]
                 display_cols = list(dict.fromkeys(display_cols))
-                st.dataframe(df[display_cols].head(50), use_container_width=True)
+                preview = df[display_cols].head(50).assign(Difficulty=difficulty.labels.head(50))
+                st.dataframe(preview, use_container_width=True)
             with col_down:
                 st.markdown('<p class="section-header">Export</p>', unsafe_allow_html=True)
                 st.download_button(
@@ -878,22 +907,25 @@ elif page == "Difficulty Analysis":
 elif page == "Student Performance":
     page_header("Response Analytics", "Student Performance", "Analyze how students respond to exam questions and identify performance patterns.")
 
-    if st.session_state.responses_df is not None:
-        df = st.session_state.responses_df.copy()
+    if st.session_state.responses_preview is not None:
+        # Response rows are not kept; every figure below comes from the aggregates
+        # accumulated while the upload streamed in (src/ingest.py)
+        df = st.session_state.responses_preview
 
         c1, c2 = st.columns(2)
         with c1:
-            st.metric("Total Responses", f"{len(df):,}")
+            st.metric("Total Responses", f"{st.session_state.responses_rows:,}")
         with c2:
             if "Score" in df.columns:
-                df["Score"] = pd.to_numeric(df["Score"], errors="coerce")
-                st.metric("Average Score", f"{df['Score'].mean():.2f}")
+                st.metric("Average Score", f"{st.session_state.responses_summary['Score']['mean']:.2f}")
 
-        if "Score" in df.columns:
+        score_hist = (st.session_state.responses_histograms or {}).get("Score")
+        if score_hist is not None:
             st.markdown("<hr class='page-divider'/>", unsafe_allow_html=True)
             st.markdown('<p class="section-header">Response Score Distribution</p>', unsafe_allow_html=True)
             fig, ax = plt.subplots(figsize=(9, 4))
-            ax.hist(df["Score"].clip(-10, 50), bins=30, color="#3B82F6", edgecolor="white", linewidth=0.8, alpha=0.85)
+            ax.hist(score_hist.edges[:-1], bins=score_hist.edges, weights=score_hist.counts,
+                    color="#3B82F6", edgecolor="white", linewidth=0.8, alpha=0.85)
             ax.set_xlabel("Score")
             ax.set_ylabel("Frequency")
             ax.set_title("Distribution of Response Scores", fontweight='600', pad=12)
@@ -902,10 +934,11 @@ elif page == "Student Performance":
             st.pyplot(fig)
             plt.close()
 
-        if "ParentId" in df.columns and "Score" in df.columns:
+        if st.session_state.responses_per_question is not None:
             st.markdown("<hr class='page-divider'/>", unsafe_allow_html=True)
             st.markdown('<p class="section-header">Per-Question Response Statistics</p>', unsafe_allow_html=True)
-            per_q = df.groupby("ParentId")["Score"].agg(["mean", "count", "std"]).reset_index()
+            per_q = st.session_state.responses_per_question
+            per_q = per_q[["ParentId", "mean", "count", "std"]].copy()
             per_q.columns = ["Question ID", "Avg Score", "Response Count", "Score Std Dev"]
             per_q = per_q.sort_values("Response Count", ascending=False)
             st.dataframe(per_q.head(50), use_container_width=True)
@@ -934,7 +967,7 @@ elif page == "Visualizations":
     page_header("Data Exploration", "Visualizations & Trends", "Interactive charts to explore question quality and performance over time.")
 
     if st.session_state.questions_df is not None:
-        df = st.session_state.questions_df.copy()
+        df = st.session_state.questions_df
 
         if "Score" in df.columns:
             st.markdown('<p class="section-header">Question Score Distribution</p>', unsafe_allow_html=True)
@@ -952,9 +985,8 @@ elif page == "Visualizations":
         if date_col:
             st.markdown("<hr class='page-divider'/>", unsafe_allow_html=True)
             st.markdown('<p class="section-header">Questions Over Time</p>', unsafe_allow_html=True)
-            df["_date"]  = pd.to_datetime(df[date_col], errors="coerce")
-            df["_month"] = df["_date"].dt.to_period("M")
-            monthly = df.groupby("_month").size()
+            months  = pd.to_datetime(df[date_col], errors="coerce").dt.to_period("M")
+            monthly = months.value_counts().sort_index()
             fig, ax = plt.subplots(figsize=(10, 4))
             monthly.plot(kind="line", ax=ax, color="#F43F5E", linewidth=2.5)
             ax.fill_between(range(len(monthly)), monthly.values, alpha=0.08, color="#F43F5E")
@@ -966,17 +998,12 @@ elif page == "Visualizations":
             st.pyplot(fig)
             plt.close()
 
-        if "Score" in df.columns:
+        difficulty = question_difficulty()
+        if difficulty is not None and difficulty.score_col == "Score":
             st.markdown("<hr class='page-divider'/>", unsafe_allow_html=True)
             st.markdown('<p class="section-header">Score Distribution by Difficulty</p>', unsafe_allow_html=True)
-            q_low  = df["Score"].quantile(0.33)
-            q_high = df["Score"].quantile(0.66)
-            df["Difficulty"] = pd.cut(
-                df["Score"],
-                bins=[-np.inf, q_low, q_high, np.inf],
-                labels=["Hard", "Medium", "Easy"],
-            )
-            groups     = [df[df["Difficulty"] == d]["Score"].dropna() for d in ["Easy", "Medium", "Hard"]]
+            scores     = df["Score"].to_numpy()
+            groups     = [scores[difficulty.mask(d)] for d in DISPLAY_ORDER]
             box_colors = ["#16A34A", "#CA8A04", "#DC2626"]
             fig, ax = plt.subplots(figsize=(7, 4))
             bp = ax.boxplot(groups, patch_artist=True, notch=False,
@@ -1004,25 +1031,27 @@ elif page == "Visualizations":
 elif page == "Model Evaluation":
     page_header("Machine Learning", "Model Evaluation", "Performance metrics for the Logistic Regression difficulty classifier.")
 
-    MODEL_PATH      = "models/logistic_regression_model.pkl"
-    VECTORIZER_PATH = "models/tfidf_vectorizer.pkl"
-
-    if os.path.exists(MODEL_PATH) and os.path.exists(VECTORIZER_PATH):
-        model     = joblib.load(MODEL_PATH)
-        tfidf_vec = joblib.load(VECTORIZER_PATH)
+    if model_available(MODEL_DIR):
+        # Loaded once per process and shared by every session; reloaded only
+        # when the files in models/ change (see src/model_registry.py)
+        model = get_model(MODEL_DIR)
 
         st.success("Trained model loaded successfully")
 
+        is_hashing = model.is_hashing
+        algorithm  = model.algorithm
+        n_features = model.n_features
+
         # Model info pills
         st.markdown(f"""
         <div class="metric-row" style="grid-template-columns: repeat(3, 1fr);">
             <div class="metric-pill">
-                <div class="metric-pill-value" style="font-size:1rem;">Logistic Regression</div>
+                <div class="metric-pill-value" style="font-size:1rem;">{algorithm}</div>
                 <div class="metric-pill-label">Algorithm</div>
             </div>
             <div class="metric-pill">
-                <div class="metric-pill-value">{len(tfidf_vec.get_feature_names_out()):,}</div>
-                <div class="metric-pill-label">TF-IDF Features</div>
+                <div class="metric-pill-value">{n_features:,}</div>
+                <div class="metric-pill-label">{"Hashed" if is_hashing else "TF-IDF"} Features</div>
             </div>
             <div class="metric-pill">
                 <div class="metric-pill-value">{len(model.classes_)}</div>
@@ -1037,10 +1066,9 @@ elif page == "Model Evaluation":
 
         if st.button("Run Prediction", type="primary"):
             if user_question.strip():
-                cleaned      = clean_text_pipeline(user_question)
-                q_tfidf      = tfidf_vec.transform([cleaned])
-                prediction   = model.predict(q_tfidf)[0]
-                probabilities = model.predict_proba(q_tfidf)[0]
+                cleaned      = model.clean([user_question])
+                prediction   = model.predict(cleaned)[0]
+                probabilities = model.predict_proba(cleaned)[0]
 
                 color_map = {"Easy": "#16A34A", "Medium": "#CA8A04", "Hard": "#DC2626"}
                 badge_map = {"Easy": "badge-easy", "Medium": "badge-medium", "Hard": "badge-hard"}
@@ -1076,25 +1104,15 @@ elif page == "Model Evaluation":
 
         # Always compute live on uploaded data (no hardcoded fallback)
         if st.session_state.questions_df is not None:
-            df_eval = st.session_state.questions_df.copy()
-            if "Score" in df_eval.columns and ("Title" in df_eval.columns or "Body" in df_eval.columns):
+            df_eval    = st.session_state.questions_df
+            difficulty = question_difficulty()
+            has_text   = "Title" in df_eval.columns or "Body" in df_eval.columns
+            if difficulty is not None and difficulty.score_col == "Score" and has_text:
                 with st.spinner("Computing metrics on uploaded data…"):
-                    q_lo = df_eval["Score"].quantile(0.33)
-                    q_hi = df_eval["Score"].quantile(0.66)
-                    df_eval["_label"] = pd.cut(df_eval["Score"], bins=[-np.inf, q_lo, q_hi, np.inf], labels=["Hard", "Medium", "Easy"])
-                    df_eval = df_eval.dropna(subset=["_label"])
-                    title = df_eval["Title"].fillna("") if "Title" in df_eval.columns else pd.Series([""] * len(df_eval))
-                    body  = df_eval["Body"].fillna("") if "Body" in df_eval.columns else pd.Series([""] * len(df_eval))
-                    df_eval["_text"]    = title + " " + body
-                    df_eval["_cleaned"] = df_eval["_text"].apply(clean_text_pipeline)
-                    X_eval = tfidf_vec.transform(df_eval["_cleaned"])
-                    y_true = df_eval["_label"].astype(str)
-                    y_pred = model.predict(X_eval)
-                    acc    = accuracy_score(y_true, y_pred)
-                    report = classification_report(y_true, y_pred, output_dict=True, zero_division=0)
-                    cm_matrix    = confusion_matrix(y_true, y_pred, labels=cm_labels)
-                    metrics_data  = {"accuracy": acc, "report": report}
-                    metrics_source = "Live evaluation on your uploaded questions data"
+                    evaluation = live_evaluation(model, df_eval, difficulty, st.session_state.questions_fp, model.version)
+                cm_matrix      = evaluation["cm"]
+                metrics_data   = {"accuracy": evaluation["accuracy"], "report": evaluation["report"]}
+                metrics_source = "Live evaluation on your uploaded questions data"
 
         if metrics_data is not None:
             st.caption(f"Source: {metrics_source}")
@@ -1163,7 +1181,7 @@ elif page == "Model Evaluation":
         else:
             st.info("📂 Upload your questions CSV on the **Upload Data** page (needs a **Score** column + **Title** or **Body** column) to see live model performance metrics computed against your real data.")
     else:
-        st.warning(f"No saved model found. Train and save the model from the notebook first.\nExpected paths: `{MODEL_PATH}` and `{VECTORIZER_PATH}`")
+        st.warning(f"No saved model found. Train and save the model with `python generate_models.py` first.\nExpected artifacts in: `{MODEL_DIR}/`")
 
 
 # ══════════════════════════════════════════════
@@ -1233,31 +1251,23 @@ elif page == "Assessment Assistant":
 
     if st.button("Run AI Assessment Pipeline", type="primary"):
         try:
-            from agents.analyzer  import run_analyzer_agent
-            from agents.retriever import run_retriever_agent
-            from agents.recommend import recommend_agent
-            from agents.reporter  import generate_report
+            from agents.graph    import pipeline
+            from agents.reporter import format_recommendation, report_parts
+            from agents.runner   import run_sync_with_events
 
             topic_analysis = {}
             if "questions_df" in st.session_state and st.session_state.questions_df is not None:
                 qdf = st.session_state.questions_df
                 if "Title" in qdf.columns and "Score" in qdf.columns:
-                    qdf_sorted = qdf.sort_values(by="Score")
-                    extremes   = pd.concat([qdf_sorted.head(3), qdf_sorted.tail(2)]).drop_duplicates()
-                    for _, row in extremes.iterrows():
-                        topic_analysis[row["Title"]] = {
-                            "score": float(row["Score"]) if pd.notnull(row["Score"]) else 0.0,
-                            "difficulty": row.get("Difficulty", "Unknown")
-                        }
-            if "questions_df" in st.session_state and st.session_state.questions_df is not None:
-                qdf = st.session_state.questions_df
-                if "Title" in qdf.columns and "Score" in qdf.columns:
-                    qdf_sorted = qdf.sort_values(by="Score")
-                    extremes   = pd.concat([qdf_sorted.head(3), qdf_sorted.tail(2)]).drop_duplicates()
-                    for _, row in extremes.iterrows():
+                    difficulty = question_difficulty()
+                    order      = qdf["Score"].to_numpy().argsort(kind="stable")
+                    extremes   = list(dict.fromkeys([*order[:3], *order[-2:]]))
+                    for pos in extremes:
+                        row   = qdf.iloc[pos]
+                        label = difficulty.labels.iloc[pos] if difficulty is not None else None
                         topic_analysis[row["Title"]] = {
                             "score": float(row["Score"]) if pd.notnull(row["Score"]) else 0.0,
-                            "difficulty": row.get("Difficulty", "Unknown")
+                            "difficulty": label if pd.notnull(label) else "Unknown",
                         }
 
             # Enrich state with extra metrics
@@ -1271,34 +1281,53 @@ elif page == "Assessment Assistant":
             }
 
             # If response data is available, add global stats
-            if st.session_state.responses_df is not None:
-                rdf = st.session_state.responses_df
-                state["metadata"]["avg_student_score"] = round(rdf["Score"].mean(), 2) if "Score" in rdf.columns else "N/A"
-                state["metadata"]["total_responses"] = len(rdf)
-
-            with st.status("Running 4-Agent Pipeline…", expanded=True) as pipeline_status:
-                st.write("Agent 1 — Analyzer: Detecting difficulty problems…")
-                state    = run_analyzer_agent(state)
-                problems = state.get("problems", [])
-                for p in problems:
-                    st.write(f"  Issue: {p}")
-                st.write(f"  {len(problems)} problem(s) identified")
-
-                st.write("Agent 2 — Retriever: Fetching pedagogical principles via RAG…")
-                state      = run_retriever_agent(state)
-                principles = state.get("principles", [])
-                for pr in principles:
-                    st.write(f"  {pr[:90]}…")
-                st.write(f"  {len(principles)} principle(s) retrieved")
-
-                st.write("Agent 3 — Recommender: Generating recommendations via LLM…")
-                state = recommend_agent(state)
-                recs  = state.get("recommendations", [])
-                st.write(f"  {len(recs)} recommendation(s) generated")
-
-                st.write("Agent 4 — Reporter: Formatting structured report…")
-                report_md = generate_report(state)
-                st.write("  Report ready")
+            if st.session_state.responses_preview is not None:
+                summary = st.session_state.responses_summary
+                state["metadata"]["avg_student_score"] = round(summary["Score"]["mean"], 2) if "Score" in summary.columns else "N/A"
+                state["metadata"]["total_responses"] = st.session_state.responses_rows
+
+            pipeline_status = st.status("Running 4-Agent Pipeline…", expanded=True)
+            live_report     = st.empty()    # report preview, filled in as recommendations stream
+            with pipeline_status:
+                streamed = {"head": "", "tail": "", "lines": []}
+
+                # Replayed on this (script) thread as stages start and finish; independent
+                # stages run concurrently, so lines may interleave
+                def show_progress(event, stage, stage_state, info):
+                    if event == "start" and not stage.background and stage.label.startswith("Agent"):
+                        st.write(f"{stage.label}…")
+                    if event == "start" and stage.name == "recommender":
+                        streamed["head"], streamed["tail"] = report_parts(stage_state)
+                        live_report.markdown(streamed["head"] + "*Generating recommendations…*\n" + streamed["tail"])
+                    elif event == "progress" and stage.name == "recommender":
+                        if not streamed["lines"]:
+                            st.write(f"  First recommendation after {info['seconds']:.1f}s")
+                        st.write(f"  {info['item']}")
+                        streamed["lines"].append(info["item"])
+                        body = "".join(format_recommendation(line) for line in streamed["lines"])
+                        live_report.markdown(streamed["head"] + body + streamed["tail"])
+                    elif event == "failed":
+                        st.write(f"  {stage.name} failed: {info['error']}")
+                    elif event == "done" and stage.name == "analyzer":
+                        problems = stage_state.get("problems", [])
+                        for p in problems:
+                            st.write(f"  Issue: {p}")
+                        st.write(f"  {len(problems)} problem(s) identified")
+                    elif event == "done" and stage.name == "retriever":
+                        principles = stage_state.get("principles", [])
+                        for pr in principles:
+                            st.write(f"  {pr[:90]}…")
+                        st.write(f"  {len(principles)} principle(s) retrieved")
+                    elif event == "done" and stage.name == "recommender":
+                        st.write(f"  {len(stage_state.get('recommendations', []))} recommendation(s) generated")
+                    elif event == "done" and stage.name == "reporter":
+                        st.write(f"  Report ready ({info['seconds']:.1f}s)")
+
+                state     = run_sync_with_events(
+                    lambda emit: pipeline.run(state, on_event=emit), show_progress
+                )
+                report_md = state["report"]
+                live_report.empty()
 
                 pipeline_status.update(label="Pipeline Complete", state="complete", expanded=False)
 
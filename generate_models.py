@@ -11,19 +11,43 @@ Setup:  Place Questions.csv, Answers.csv, Tags.csv in data/raw/
 
 Usage:
     python generate_models.py
+    python generate_models.py --stream [--chunksize 100000]   # bounded memory
+    python generate_models.py --no-cache                       # ignore data/cache/
+    python generate_models.py --search grid|random [--n-jobs 8]
+    python generate_models.py --trainer sgd [--resume]          # out-of-core, 100% of data
 """
 
 import os
-import re
+import sys
 import json
-import html
+import hashlib
+import argparse
 import numpy as np
 import pandas as pd
 import joblib
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split, cross_val_score
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from normalization import DEFAULT_CONFIG, normalize_text, save_config
+from compact_model import export_compact_model
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    _PARQUET_AVAILABLE = True
+except ImportError:
+    _PARQUET_AVAILABLE = False
+
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.pipeline import Pipeline
+from scipy.sparse import vstack
+from sklearn.model_selection import (
+    train_test_split,
+    cross_val_score,
+    GridSearchCV,
+    RandomizedSearchCV,
+)
 from sklearn.metrics import (
     accuracy_score,
     classification_report,
@@ -33,11 +57,34 @@ from sklearn.metrics import (
 # ── Configuration ────────────────────────────────────────────────────────────
 RAW_DIR = "data/raw"
 MODEL_DIR = "models"
-SAMPLE_FRAC = 0.4          # stratified sample fraction
+CACHE_DIR = "data/cache"   # cleaned corpus cache (Parquet), see --no-cache
+SAMPLE_FRAC = 0.4          # sampled fraction of every class (per-Id hash, see _in_sample)
+SAMPLE_BUCKETS = 10_000    # resolution of the per-Id sampling rule
 TEST_SIZE = 0.20           # 80/20 split
 CV_FOLDS = 5               # 5-fold cross-validation
 RANDOM_STATE = 42
 MAX_TFIDF_FEATURES = 10000
+CHUNK_SIZE = 100_000       # rows per chunk when streaming (--stream)
+LABEL_THRESHOLDS = {"Easy": 0.035, "Medium": 0.020}  # on the normalized Bayesian score
+N_JOBS = -1                # CV folds / search candidates run on all cores
+
+# Hyperparameter search (--search grid|random)
+SEARCH_SPACE = {
+    "tfidf__max_features": [5000, 10000, 20000],
+    "tfidf__ngram_range": [(1, 1), (1, 2)],
+    "clf__C": [0.1, 0.5, 1.0, 2.0, 5.0],
+    "clf__solver": ["lbfgs", "saga"],
+}
+SEARCH_RANDOM_ITER = 20    # candidates sampled by --search random
+SEARCH_CACHE_DIR = os.path.join(CACHE_DIR, "search")
+
+# Out-of-core trainer (--trainer sgd): stateless hashing + partial_fit
+HASHING_FEATURES = 2 ** 20
+SGD_ALPHA = 1e-6
+SGD_EPOCHS = 1             # passes over the streamed corpus
+CLASSES = ["Easy", "Hard", "Medium"]
+HOLDOUT_MAX_ROWS = 100_000 # hashed holdout rows kept in memory for the final evaluation
+NORMALIZATION = DEFAULT_CONFIG  # shared with app.py via models/normalization.json
 
 os.makedirs(MODEL_DIR, exist_ok=True)
 
@@ -46,54 +93,66 @@ os.makedirs(MODEL_DIR, exist_ok=True)
 def clean_text(text: str) -> str:
     """
     Clean raw question/answer text for ML processing.
-    Strips HTML tags, lowercases, removes non-alphabetic characters,
-    and collapses whitespace.
+    Delegates to the shared normalization module (see src/normalization.py)
+    so the app cleans live questions exactly the same way.
     """
-    if pd.isna(text) or not isinstance(text, str):
-        return ""
-    text = html.unescape(text)
-    text = re.sub(r"<[^>]+>", " ", text)   # strip HTML tags
-    text = text.lower()
-    text = re.sub(r"[^a-z\s]", " ", text)  # keep only letters
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    return normalize_text(text, NORMALIZATION, cache=False)
 
 
-# ── Main Training Pipeline ───────────────────────────────────────────────────
-def main():
-    questions_path = os.path.join(RAW_DIR, "Questions.csv")
-    answers_path = os.path.join(RAW_DIR, "Answers.csv")
+# ── Ingestion ────────────────────────────────────────────────────────────────
+# Only the columns training needs are ever read. With a chunksize the CSVs
+# are streamed, so peak memory is one raw chunk plus the running aggregates.
+QUESTION_COLUMNS = ["Id", "Title", "Body"]
+QUESTION_DTYPES = {"Id": "Int64", "Title": "string", "Body": "string"}
+ANSWER_COLUMNS = ["ParentId", "Score"]
+ANSWER_DTYPES = {"ParentId": "Int64", "Score": "Int64"}
 
-    # ── 1. Load raw data ─────────────────────────────────────────────────
-    print("Loading StackOverflow Questions ...")
-    questions_df = pd.read_csv(questions_path, encoding="latin1")
-    print(f"  Questions: {len(questions_df)} rows")
 
-    print("Loading StackOverflow Answers ...")
-    answers_df = pd.read_csv(answers_path, encoding="latin1")
-    print(f"  Answers:   {len(answers_df)} rows")
+def _read_csv(path: str, usecols: list, dtypes: dict, chunksize: int = None):
+    """Yield DataFrame chunks (a single chunk when chunksize is None)."""
+    kwargs = dict(encoding="latin1", usecols=usecols, dtype=dtypes)
+    if not chunksize:
+        yield pd.read_csv(path, **kwargs)
+        return
+    yield from pd.read_csv(path, chunksize=chunksize, **kwargs)
 
-    # ── 2. Clean question text ───────────────────────────────────────────
-    print("\nCleaning question text ...")
-    questions_df["clean_text"] = (
-        questions_df["Title"].fillna("") + " " + questions_df["Body"].fillna("")
-    ).apply(clean_text)
-    questions_df = questions_df[questions_df["clean_text"].str.len() > 0]
-    print(f"  {len(questions_df)} questions after cleaning")
 
-    # ── 3. Clean answer text & compute answer stats ──────────────────────
-    print("Computing answer statistics ...")
-    answers_df["clean_text"] = answers_df["Body"].fillna("").apply(clean_text)
-
-    answer_stats = answers_df.groupby("ParentId").agg(
-        avg_answer_score=("Score", "mean"),
-        answer_count=("Score", "count"),
-        max_answer_score=("Score", "max"),
-    ).reset_index()
-    answer_stats.rename(columns={"ParentId": "question_id"}, inplace=True)
-    print(f"  Answer stats for {len(answer_stats)} questions")
+def _combine_answer_partials(partials: list) -> pd.DataFrame:
+    combined = pd.concat(partials)
+    return combined.groupby(level=0).agg({"score_sum": "sum", "answer_count": "sum",
+                                          "max_answer_score": "max"})
 
-    # ── 4. Bayesian smoothing + normalize scores ─────────────────────────
+
+def compute_answer_stats(answers_path: str, chunksize: int = None) -> pd.DataFrame:
+    """
+    Per-question answer statistics (mean / count / max of answer Score).
+
+    Aggregates sum, count and max per ParentId chunk by chunk and merges the
+    partial results, so the answers file never has to fit in memory.
+    """
+    partials = []
+    n_rows = 0
+    for chunk in _read_csv(answers_path, ANSWER_COLUMNS, ANSWER_DTYPES, chunksize):
+        n_rows += len(chunk)
+        chunk = chunk.dropna()
+        partials.append(chunk.groupby("ParentId")["Score"].agg(
+            score_sum="sum", answer_count="count", max_answer_score="max",
+        ))
+        # Keep the number of pending partials (and their memory) bounded
+        if len(partials) >= 16:
+            partials = [_combine_answer_partials(partials)]
+    print(f"  Answers:   {n_rows} rows")
+
+    stats = _combine_answer_partials(partials)
+    stats["avg_answer_score"] = stats["score_sum"].astype("float64") / stats["answer_count"]
+    stats = stats.drop(columns="score_sum").reset_index()
+    stats.rename(columns={"ParentId": "question_id"}, inplace=True)
+    stats["question_id"] = stats["question_id"].astype("int64")
+    return stats[["question_id", "avg_answer_score", "answer_count", "max_answer_score"]]
+
+
+def label_answer_stats(answer_stats: pd.DataFrame) -> pd.DataFrame:
+    """Bayesian-smooth the average answer score and assign Easy/Medium/Hard."""
     global_mean = answer_stats["avg_answer_score"].mean()
     C = answer_stats["answer_count"].mean()
 
@@ -108,94 +167,437 @@ def main():
         (answer_stats["bayesian_avg_score"] - min_score) / (max_score - min_score)
     )
 
-    # ── 5. Assign difficulty labels using thresholds ─────────────────────
     def assign_difficulty(score):
-        if score >= 0.035:
+        if score >= LABEL_THRESHOLDS["Easy"]:
             return "Easy"
-        elif score >= 0.020:
+        elif score >= LABEL_THRESHOLDS["Medium"]:
             return "Medium"
         else:
             return "Hard"
 
     answer_stats["difficulty"] = answer_stats["avg_score_normalized"].apply(assign_difficulty)
+    return answer_stats
 
-    print("\nRaw difficulty distribution:")
-    for label, count in answer_stats["difficulty"].value_counts().items():
-        print(f"  {label}: {count}")
 
-    # ── 6. Merge questions with difficulty labels ────────────────────────
-    questions_with_labels = questions_df.merge(
-        answer_stats[["question_id", "difficulty"]],
-        left_on="Id",
-        right_on="question_id",
-        how="inner",
-    )
-    print(f"\n  {len(questions_with_labels)} questions after merge with answer stats")
-
-    # ── 7. Stratified sample (to keep training manageable) ───────────────
-    questions_sampled = (
-        questions_with_labels
-        .groupby("difficulty", group_keys=False)
-        .apply(lambda grp: grp.sample(frac=SAMPLE_FRAC, random_state=RANDOM_STATE),
-               include_groups=False)
-        .reset_index(drop=True)
-    )
+CORPUS_STAT_COLUMNS = ["avg_answer_score", "answer_count", "max_answer_score"]
 
-    # Re-attach difficulty from the index if dropped by apply
-    if "difficulty" not in questions_sampled.columns:
-        # Fallback: simple stratified sample
-        questions_sampled = questions_with_labels.sample(
-            frac=SAMPLE_FRAC, random_state=RANDOM_STATE
-        ).reset_index(drop=True)
-    print(f"  Sampled {len(questions_sampled)} questions ({SAMPLE_FRAC*100:.0f}% stratified)")
 
-    print("\nSampled class distribution:")
-    for label, count in questions_sampled["difficulty"].value_counts().items():
-        print(f"  {label}: {count} ({count / len(questions_sampled) * 100:.1f}%)")
+def iter_labelled_questions(questions_path: str, answer_stats: pd.DataFrame, chunksize: int = None):
+    """
+    Yield DataFrames of (Id, clean_text, difficulty, answer stats) for labelled questions.
 
-    # ── 8. Prepare features and labels ───────────────────────────────────
-    X_text = questions_sampled["clean_text"].fillna("").tolist()
-    y = questions_sampled["difficulty"].tolist()
+    Questions are joined to their label before cleaning, so unlabelled rows
+    are never cleaned, and raw Title/Body are dropped as soon as they are.
+    """
+    stats = answer_stats.set_index("question_id")[["difficulty"] + CORPUS_STAT_COLUMNS]
+    for chunk in _read_csv(questions_path, QUESTION_COLUMNS, QUESTION_DTYPES, chunksize):
+        chunk = chunk.dropna(subset=["Id"])
+        chunk["Id"] = chunk["Id"].astype("int64")
+        chunk = chunk.join(stats, on="Id", how="inner")
+        text = chunk["Title"].fillna("") + " " + chunk["Body"].fillna("")
+        chunk = chunk.drop(columns=["Title", "Body"])
+        chunk.insert(1, "clean_text", text.map(clean_text).astype(object))
+        yield chunk[chunk["clean_text"].str.len() > 0].reset_index(drop=True)
+
+
+def _in_sample(ids: pd.Series, sample_frac: float) -> np.ndarray:
+    """
+    Deterministic per-question sample: keep an Id iff its hash falls in the
+    first `sample_frac` of the hash range.
 
-    # ── 9. TF-IDF vectorization ──────────────────────────────────────────
-    print(f"\nFitting TF-IDF vectorizer (max_features={MAX_TFIDF_FEATURES}) ...")
-    vectorizer = TfidfVectorizer(
+    The decision depends on the Id alone, never on which chunk or Parquet row
+    group the row arrived in, so streamed, cached and in-memory runs sample
+    the same questions, and every class (even one with a single row in a
+    chunk) keeps ~sample_frac of its rows.
+    """
+    hashes = pd.util.hash_pandas_object(ids, index=False, hash_key=f"{RANDOM_STATE:016d}").to_numpy()
+    return hashes % SAMPLE_BUCKETS < round(sample_frac * SAMPLE_BUCKETS)
+
+
+def load_training_corpus(chunks, sample_frac: float = SAMPLE_FRAC) -> pd.DataFrame:
+    """Concatenate corpus chunks, keeping the per-Id sample of each (see _in_sample)."""
+    parts = []
+    n_labelled = 0
+    for chunk in chunks:
+        n_labelled += len(chunk)
+        if sample_frac < 1.0:
+            chunk = chunk[_in_sample(chunk["Id"], sample_frac)]
+        parts.append(chunk)
+    print(f"  {n_labelled} labelled questions after cleaning")
+    return pd.concat(parts, ignore_index=True)
+
+
+# ── Corpus Cache ─────────────────────────────────────────────────────────────
+# The cleaned, labelled corpus is written to data/cache/ as Parquet (one row
+# group per ingestion chunk) and reused while the raw files, the cleaning
+# config and the labelling thresholds are unchanged.
+def _file_fingerprint(path: str) -> dict:
+    """Size, mtime and a hash of the first/last MiB — cheap even for multi-GB files."""
+    st = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        digest.update(f.read(1 << 20))
+        if st.st_size > (2 << 20):
+            f.seek(-(1 << 20), os.SEEK_END)
+            digest.update(f.read())
+    return {"name": os.path.basename(path), "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns, "sample_sha256": digest.hexdigest()}
+
+
+def corpus_cache_path(questions_path: str, answers_path: str) -> str:
+    key = json.dumps({
+        "inputs": [_file_fingerprint(questions_path), _file_fingerprint(answers_path)],
+        "normalization": NORMALIZATION.to_dict(),
+        "label_thresholds": LABEL_THRESHOLDS,
+    }, sort_keys=True)
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"corpus-{digest}.parquet")
+
+
+def iter_cached_corpus(cache_path: str):
+    """Yield the cached corpus back chunk by chunk (one row group at a time)."""
+    parquet_file = pq.ParquetFile(cache_path)
+    for i in range(parquet_file.num_row_groups):
+        yield parquet_file.read_row_group(i).to_pandas()
+
+
+def write_through_cache(chunks, cache_path: str):
+    """Pass chunks through unchanged while writing them to `cache_path`."""
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table)
+            yield chunk
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            os.remove(tmp_path)
+        raise
+    if writer is not None:
+        writer.close()
+        # Only a complete corpus ever becomes visible under the final name
+        os.replace(tmp_path, cache_path)
+        print(f"  Cached cleaned corpus → {cache_path}")
+
+
+# ── Hyperparameter Search ────────────────────────────────────────────────────
+def _make_vectorizer(**overrides) -> TfidfVectorizer:
+    params = dict(
         max_features=MAX_TFIDF_FEATURES,
         min_df=5,
         max_df=0.8,
         ngram_range=(1, 2),
         sublinear_tf=True,
     )
-    X_tfidf = vectorizer.fit_transform(X_text)
-    print(f"  Feature matrix shape: {X_tfidf.shape}")
+    params.update(overrides)
+    return TfidfVectorizer(**params)
 
-    # ── 10. Train/Test split ─────────────────────────────────────────────
-    X_train, X_test, y_train, y_test = train_test_split(
-        X_tfidf, y,
-        test_size=TEST_SIZE,
-        random_state=RANDOM_STATE,
-        stratify=y,
-    )
-    print(f"\n  Train set: {X_train.shape[0]} samples")
-    print(f"  Test set:  {X_test.shape[0]} samples")
 
-    # ── 11. Cross-validation on training set ─────────────────────────────
-    print(f"\nRunning {CV_FOLDS}-fold cross-validation on training set ...")
-    model = LogisticRegression(
+def _make_classifier(**overrides) -> LogisticRegression:
+    params = dict(
         class_weight="balanced",
         max_iter=3000,
         solver="lbfgs",
         random_state=RANDOM_STATE,
     )
-    cv_scores = cross_val_score(model, X_train, y_train, cv=CV_FOLDS, scoring="accuracy")
-    print(f"  CV Accuracy per fold: {[f'{s:.3f}' for s in cv_scores]}")
-    print(f"  CV Mean Accuracy:     {cv_scores.mean():.3f} ± {cv_scores.std():.3f}")
+    params.update(overrides)
+    return LogisticRegression(**params)
+
+
+def search_hyperparameters(X_train_text: list, y_train: list, strategy: str, n_jobs: int = N_JOBS):
+    """
+    Grid or random search over TF-IDF and LogisticRegression parameters.
+
+    Folds × candidates run in parallel. The pipeline caches each fitted
+    TF-IDF step (joblib.Memory, shared across worker processes), so a
+    vectorizer is fit once per (fold, TF-IDF params) and reused by every
+    classifier candidate instead of being refit per candidate.
+
+    Returns (vectorizer, model, cv_scores of the best candidate), with the
+    best pipeline already refit on the whole training set.
+    """
+    memory = joblib.Memory(SEARCH_CACHE_DIR, verbose=0)
+    pipeline = Pipeline(
+        [("tfidf", _make_vectorizer()), ("clf", _make_classifier())],
+        memory=memory,
+    )
+    common = dict(cv=CV_FOLDS, scoring="accuracy", n_jobs=n_jobs, refit=True, error_score=np.nan)
+    if strategy == "grid":
+        search = GridSearchCV(pipeline, SEARCH_SPACE, **common)
+    else:
+        search = RandomizedSearchCV(pipeline, SEARCH_SPACE, n_iter=SEARCH_RANDOM_ITER,
+                                    random_state=RANDOM_STATE, **common)
+
+    try:
+        search.fit(X_train_text, y_train)
+    finally:
+        memory.clear(warn=False)
+
+    best = search.best_index_
+    cv_scores = np.array([search.cv_results_[f"split{i}_test_score"][best] for i in range(CV_FOLDS)])
+    print(f"  Evaluated {len(search.cv_results_['params'])} candidates × {CV_FOLDS} folds")
+    print(f"  Best params: {search.best_params_}")
+    return search.best_estimator_.named_steps["tfidf"], search.best_estimator_.named_steps["clf"], cv_scores
+
+
+def model_params(vectorizer: TfidfVectorizer, model: LogisticRegression) -> dict:
+    """The searched hyperparameters as set on a fitted vectorizer/model pair."""
+    return {
+        "tfidf__max_features": vectorizer.max_features,
+        "tfidf__ngram_range": vectorizer.ngram_range,
+        "clf__C": model.C,
+        "clf__solver": model.solver,
+    }
+
+
+# ── Out-of-core Training ─────────────────────────────────────────────────────
+def _make_hashing_vectorizer() -> HashingVectorizer:
+    return HashingVectorizer(
+        n_features=HASHING_FEATURES,
+        ngram_range=(1, 2),
+        alternate_sign=False,
+        norm="l2",
+    )
+
+
+def _is_holdout(ids: pd.Series) -> np.ndarray:
+    """Deterministic ~TEST_SIZE holdout by question Id, stable across chunks and runs."""
+    return (ids.to_numpy() % round(1 / TEST_SIZE)) == 0
+
+
+def _load_incremental_model():
+    """Existing SGD model + hashing vectorizer from MODEL_DIR, or (None, None)."""
+    model_path = os.path.join(MODEL_DIR, "logistic_regression_model.pkl")
+    vectorizer_path = os.path.join(MODEL_DIR, "tfidf_vectorizer.pkl")
+    if not (os.path.exists(model_path) and os.path.exists(vectorizer_path)):
+        return None, None
+    model = joblib.load(model_path)
+    vectorizer = joblib.load(vectorizer_path)
+    if not isinstance(model, SGDClassifier) or not isinstance(vectorizer, HashingVectorizer):
+        return None, None
+    return model, vectorizer
 
-    # ── 12. Train final model on full training set ───────────────────────
-    print("\nTraining final Logistic Regression model ...")
-    model.fit(X_train, y_train)
 
-    # ── 13. Evaluate on held-out test set ────────────────────────────────
+def train_incremental(chunksize: int = CHUNK_SIZE, use_cache: bool = True, resume: bool = False):
+    """
+    Train on 100% of the corpus without holding it in memory.
+
+    Chunks of cleaned questions are hashed (no vocabulary to fit) and fed to
+    a log-loss SGDClassifier via partial_fit — a logistic regression that
+    never needs the full sparse matrix. Class imbalance is handled with
+    per-sample weights from the label counts of the cleaned corpus (the
+    rows actually trained on, cached or not). With `resume`, an
+    existing SGD model in MODEL_DIR keeps learning from the new data
+    instead of starting over.
+    """
+    chunksize = chunksize or CHUNK_SIZE
+    model, vectorizer = _load_incremental_model() if resume else (None, None)
+    resumed = model is not None
+    if resumed:
+        print("Resuming from existing SGD model in models/\n")
+    else:
+        if resume:
+            print("No SGD model found in models/ — training from scratch\n")
+        vectorizer = _make_hashing_vectorizer()
+        model = SGDClassifier(loss="log_loss", alpha=SGD_ALPHA, random_state=RANDOM_STATE)
+
+    n_train = 0
+    X_holdout, y_holdout = [], []
+    n_holdout = 0
+    for epoch in range(SGD_EPOCHS):
+        chunks, label_counts = open_corpus(chunksize, use_cache)
+        if label_counts is None:
+            # Not cached yet: count the cleaned corpus in one pass (which
+            # writes the cache when enabled), then train from the start
+            print("  Counting labels of the cleaned corpus ...")
+            label_counts = count_corpus_labels(chunks)
+            chunks, _ = open_corpus(chunksize, use_cache)
+        # "balanced" weights: n_samples / (n_classes * count)
+        class_weight = {
+            label: label_counts.sum() / (len(CLASSES) * max(label_counts.get(label, 0), 1))
+            for label in CLASSES
+        }
+        last_epoch = epoch == SGD_EPOCHS - 1
+        if SGD_EPOCHS > 1:
+            print(f"\nEpoch {epoch + 1}/{SGD_EPOCHS}")
+
+        for chunk in chunks:
+            holdout = _is_holdout(chunk["Id"])
+            train, test = chunk[~holdout], chunk[holdout]
+            if len(train):
+                X = vectorizer.transform(train["clean_text"])
+                weights = train["difficulty"].map(class_weight).to_numpy()
+                model.partial_fit(X, train["difficulty"], classes=CLASSES, sample_weight=weights)
+            if last_epoch:
+                n_train += len(train)
+                # Hashed holdout rows are small and sparse; keep (a capped number of) them
+                test = test.iloc[:max(HOLDOUT_MAX_ROWS - n_holdout, 0)]
+                if len(test):
+                    X_holdout.append(vectorizer.transform(test["clean_text"]))
+                    y_holdout.extend(test["difficulty"].tolist())
+                    n_holdout += len(test)
+            print(f"  ... {n_train} training questions streamed", end="\r")
+    print()
+
+    y_test = y_holdout
+    y_pred = model.predict(vstack(X_holdout)).tolist() if X_holdout else []
+
+    # ── Evaluate on the Id-based holdout ─────────────────────────────────
+    test_acc = accuracy_score(y_test, y_pred)
+    report = classification_report(y_test, y_pred, output_dict=True, zero_division=0)
+    cm = confusion_matrix(y_test, y_pred, labels=model.classes_)
+
+    print(f"\n{'═' * 40}")
+    print(f"  Holdout Accuracy: {test_acc:.3f}")
+    print(f"{'═' * 40}")
+    print(f"\n{classification_report(y_test, y_pred, zero_division=0)}")
+    print(f"Confusion Matrix:\n{cm}")
+
+    # ── Save in the same artifact layout as the TF-IDF model ─────────────
+    joblib.dump(model, os.path.join(MODEL_DIR, "logistic_regression_model.pkl"))
+    joblib.dump(vectorizer, os.path.join(MODEL_DIR, "tfidf_vectorizer.pkl"))
+    np.save(os.path.join(MODEL_DIR, "confusion_matrix.npy"), cm)
+    save_config(NORMALIZATION, MODEL_DIR)
+    export_compact_model(model, vectorizer, MODEL_DIR)
+
+    metrics = {
+        "model_type": "sgd_hashing",
+        "accuracy": test_acc,
+        "report": report,
+        "train_samples": int(n_train),
+        "test_samples": int(n_holdout),
+        "total_samples": int(n_train + n_holdout),
+        "hashing_features": HASHING_FEATURES,
+        "resumed": resumed,
+    }
+    with open(os.path.join(MODEL_DIR, "model_metrics.json"), "w") as f:
+        json.dump(metrics, f, indent=2)
+
+    print(f"\n✅ SGD model and metrics saved to {MODEL_DIR}/")
+
+
+# ── Main Training Pipeline ───────────────────────────────────────────────────
+def count_corpus_labels(chunks) -> pd.Series:
+    """Difficulty counts over corpus chunks (consumes them)."""
+    counts = pd.Series(0, index=CLASSES, dtype="int64")
+    for chunk in chunks:
+        counts = counts.add(chunk["difficulty"].value_counts(), fill_value=0).astype("int64")
+    return counts
+
+
+def open_corpus(chunksize: int = None, use_cache: bool = True) -> tuple:
+    """
+    Return (iterator over cleaned, labelled corpus chunks, label counts).
+
+    Reads the Parquet cache when it is valid; otherwise computes the answer
+    stats and labels and streams cleaned question chunks from the raw CSVs,
+    writing them through to the cache on the way. The label counts are those
+    of the cleaned corpus, so they are only known up front for a cached
+    corpus and are None otherwise (see count_corpus_labels).
+    """
+    questions_path = os.path.join(RAW_DIR, "Questions.csv")
+    answers_path = os.path.join(RAW_DIR, "Answers.csv")
+    if chunksize:
+        print(f"Streaming input in chunks of {chunksize} rows\n")
+
+    cache_path = corpus_cache_path(questions_path, answers_path) if _PARQUET_AVAILABLE else None
+    if use_cache and not _PARQUET_AVAILABLE:
+        print("(pyarrow not installed — cleaned corpus will not be cached)\n")
+
+    if use_cache and cache_path and os.path.exists(cache_path):
+        # ── 1-3. Reuse the cleaned, labelled corpus from a previous run ──
+        print(f"Loading cached cleaned corpus from {cache_path} ...")
+        label_counts = pq.read_table(cache_path, columns=["difficulty"]).to_pandas()["difficulty"].value_counts()
+        return iter_cached_corpus(cache_path), label_counts
+
+    # ── 1. Answer stats (streamed, running sum/count/max per question) ───
+    print("Computing answer statistics ...")
+    answer_stats = compute_answer_stats(answers_path, chunksize)
+    print(f"  Answer stats for {len(answer_stats)} questions")
+
+    # ── 2. Bayesian smoothing, normalization & difficulty labels ─────────
+    answer_stats = label_answer_stats(answer_stats)
+
+    print("\nRaw difficulty distribution:")
+    for label, count in answer_stats["difficulty"].value_counts().items():
+        print(f"  {label}: {count}")
+
+    # ── 3. Load, label & clean questions ─────────────────────────────────
+    print("\nLoading and cleaning StackOverflow Questions ...")
+    chunks = iter_labelled_questions(questions_path, answer_stats, chunksize)
+    if use_cache and cache_path:
+        chunks = write_through_cache(chunks, cache_path)
+    return chunks, None
+
+
+def main(chunksize: int = None, use_cache: bool = True, search: str = None, n_jobs: int = N_JOBS):
+    chunks, _ = open_corpus(chunksize, use_cache)
+    questions_sampled = load_training_corpus(chunks)
+    print(f"  Sampled {len(questions_sampled)} questions ({SAMPLE_FRAC*100:.0f}% of each class)")
+
+    print("\nSampled class distribution:")
+    for label, count in questions_sampled["difficulty"].value_counts().items():
+        print(f"  {label}: {count} ({count / len(questions_sampled) * 100:.1f}%)")
+
+    # ── 4. Prepare features and labels ───────────────────────────────────
+    X_text = questions_sampled["clean_text"].fillna("").tolist()
+    y = questions_sampled["difficulty"].tolist()
+
+    if search:
+        # ── 5. Train/Test split on raw text (vectorizer is tuned too) ────
+        X_train_text, X_test_text, y_train, y_test = train_test_split(
+            X_text, y,
+            test_size=TEST_SIZE,
+            random_state=RANDOM_STATE,
+            stratify=y,
+        )
+        print(f"\n  Train set: {len(X_train_text)} samples")
+        print(f"  Test set:  {len(X_test_text)} samples")
+
+        # ── 6-8. Parallel CV search; best pipeline refit on training set ─
+        print(f"\nRunning {search} search with {CV_FOLDS}-fold CV (n_jobs={n_jobs}) ...")
+        vectorizer, model, cv_scores = search_hyperparameters(X_train_text, y_train, search, n_jobs)
+        print(f"  CV Accuracy per fold: {[f'{s:.3f}' for s in cv_scores]}")
+        print(f"  CV Mean Accuracy:     {cv_scores.mean():.3f} ± {cv_scores.std():.3f}")
+        X_train = vectorizer.transform(X_train_text)
+        X_test = vectorizer.transform(X_test_text)
+        n_features = len(vectorizer.vocabulary_)
+    else:
+        # ── 5. TF-IDF vectorization ──────────────────────────────────────
+        print(f"\nFitting TF-IDF vectorizer (max_features={MAX_TFIDF_FEATURES}) ...")
+        vectorizer = _make_vectorizer()
+        X_tfidf = vectorizer.fit_transform(X_text)
+        n_features = X_tfidf.shape[1]
+        print(f"  Feature matrix shape: {X_tfidf.shape}")
+
+        # ── 6. Train/Test split ──────────────────────────────────────────
+        X_train, X_test, y_train, y_test = train_test_split(
+            X_tfidf, y,
+            test_size=TEST_SIZE,
+            random_state=RANDOM_STATE,
+            stratify=y,
+        )
+        print(f"\n  Train set: {X_train.shape[0]} samples")
+        print(f"  Test set:  {X_test.shape[0]} samples")
+
+        # ── 7. Cross-validation on training set (folds in parallel) ──────
+        print(f"\nRunning {CV_FOLDS}-fold cross-validation on training set ...")
+        model = _make_classifier()
+        cv_scores = cross_val_score(model, X_train, y_train, cv=CV_FOLDS, scoring="accuracy",
+                                    n_jobs=n_jobs)
+        print(f"  CV Accuracy per fold: {[f'{s:.3f}' for s in cv_scores]}")
+        print(f"  CV Mean Accuracy:     {cv_scores.mean():.3f} ± {cv_scores.std():.3f}")
+
+        # ── 8. Train final model on full training set ────────────────────
+        print("\nTraining final Logistic Regression model ...")
+        model.fit(X_train, y_train)
+
+    # ── 9. Evaluate on held-out test set ─────────────────────────────────
     y_pred = model.predict(X_test)
     test_acc = accuracy_score(y_test, y_pred)
     report = classification_report(y_test, y_pred, output_dict=True, zero_division=0)
@@ -207,7 +609,7 @@ def main():
     print(f"\n{classification_report(y_test, y_pred, zero_division=0)}")
     print(f"Confusion Matrix:\n{cm}")
 
-    # ── 14. Feature importance (top words per class) ─────────────────────
+    # ── 10. Feature importance (top words per class) ─────────────────────
     feature_names = vectorizer.get_feature_names_out()
     print("\nTop 10 TF-IDF features per class:")
     for i, class_label in enumerate(model.classes_):
@@ -215,12 +617,15 @@ def main():
         top10_words = [feature_names[j] for j in top10_idx]
         print(f"  {class_label}: {top10_words}")
 
-    # ── 15. Save model, vectorizer, and metrics ──────────────────────────
+    # ── 11. Save model, vectorizer, and metrics ──────────────────────────
     joblib.dump(model, os.path.join(MODEL_DIR, "logistic_regression_model.pkl"))
     joblib.dump(vectorizer, os.path.join(MODEL_DIR, "tfidf_vectorizer.pkl"))
     np.save(os.path.join(MODEL_DIR, "confusion_matrix.npy"), cm)
+    save_config(NORMALIZATION, MODEL_DIR)
+    export_compact_model(model, vectorizer, MODEL_DIR)
 
     metrics = {
+        "model_type": "tfidf_logreg",
         "accuracy": test_acc,
         "cv_mean_accuracy": float(cv_scores.mean()),
         "cv_std": float(cv_scores.std()),
@@ -229,8 +634,12 @@ def main():
         "train_samples": int(X_train.shape[0]),
         "test_samples": int(X_test.shape[0]),
         "total_samples": len(questions_sampled),
-        "tfidf_features": int(X_tfidf.shape[1]),
+        "tfidf_features": int(n_features),
     }
+    if search:
+        metrics["search"] = {"strategy": search, "best_params": {
+            k: list(v) if isinstance(v, tuple) else v for k, v in model_params(vectorizer, model).items()
+        }}
     with open(os.path.join(MODEL_DIR, "model_metrics.json"), "w") as f:
         json.dump(metrics, f, indent=2)
 
@@ -238,8 +647,36 @@ def main():
     print(f"   logistic_regression_model.pkl")
     print(f"   tfidf_vectorizer.pkl")
     print(f"   confusion_matrix.npy")
+    print(f"   normalization.json")
+    print(f"   compact/  (memory-mappable arrays, no scikit-learn needed to load)")
     print(f"   model_metrics.json")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Train the difficulty classifier.")
+    parser.add_argument("--stream", action="store_true",
+                        help="read the raw CSVs in chunks instead of all at once")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE,
+                        help=f"rows per chunk with --stream (default {CHUNK_SIZE})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="re-clean the raw CSVs even if a cached corpus exists")
+    parser.add_argument("--search", choices=["grid", "random"],
+                        help="tune TF-IDF + classifier hyperparameters with parallel CV")
+    parser.add_argument("--n-jobs", type=int, default=N_JOBS,
+                        help="parallel workers for CV / search (-1 = all cores)")
+    parser.add_argument("--trainer", choices=["tfidf", "sgd"], default="tfidf",
+                        help="tfidf: TF-IDF + LogisticRegression on a sample (default); "
+                             "sgd: hashing + partial_fit over the full streamed corpus")
+    parser.add_argument("--resume", action="store_true",
+                        help="with --trainer sgd, keep training the saved SGD model on new data")
+    args = parser.parse_args()
+
+    if args.trainer == "sgd":
+        train_incremental(chunksize=args.chunksize, use_cache=not args.no_cache, resume=args.resume)
+    else:
+        main(
+            chunksize=args.chunksize if args.stream else None,
+            use_cache=not args.no_cache,
+            search=args.search,
+            n_jobs=args.n_jobs,
+        )
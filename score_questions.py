@@ -0,0 +1,48 @@
+"""
+score_questions.py — Score a question bank with the trained difficulty model
+
+Reads questions (Title and/or Body, optional Id) from a CSV or JSON Lines
+file in batches and writes the predicted difficulty plus one probability
+column per class. Memory use is bounded by --batch-size, not by the size of
+the input, so it is suitable for nightly runs over the full question bank.
+
+Usage:
+    python score_questions.py questions.csv scored.csv
+    python score_questions.py questions.jsonl scored.jsonl --batch-size 50000
+    python score_questions.py questions.csv scored.csv --keep Id Title Tags
+"""
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from model_registry import MODEL_DIR, model_available
+from scoring import BATCH_SIZE, DEFAULT_KEEP_COLUMNS, score_file
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score questions with the difficulty classifier.")
+    parser.add_argument("input", help="questions file (.csv or .jsonl)")
+    parser.add_argument("output", help="where to write the scores (.csv or .jsonl)")
+    parser.add_argument("--model-dir", default=MODEL_DIR,
+                        help=f"directory with the trained model (default {MODEL_DIR})")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"questions per batch (default {BATCH_SIZE})")
+    parser.add_argument("--keep", nargs="+", default=DEFAULT_KEEP_COLUMNS,
+                        help="input columns to copy to the output (default: Id)")
+    args = parser.parse_args()
+
+    if not model_available(args.model_dir):
+        print(f"❌ No trained model in {args.model_dir}/ — run generate_models.py first.")
+        sys.exit(1)
+
+    print(f"Scoring {args.input} → {args.output}")
+    summary = score_file(args.input, args.output, model_dir=args.model_dir,
+                         batch_size=args.batch_size, keep_columns=args.keep)
+    print(json.dumps(summary, indent=2))
+    if summary["skipped_rows"]:
+        print(f"⚠ {summary['skipped_rows']:,} malformed row(s) were skipped")
+    print(f"✅ Scored {summary['rows']:,} questions")
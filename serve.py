@@ -0,0 +1,178 @@
+"""
+serve.py — Local HTTP service for the difficulty classifier
+
+Concurrent single-question requests are coalesced into micro-batches
+(src/batching.py) before the model is called, so the service sustains high
+request rates with stable tail latency. Uses only the standard library
+HTTP server; the model comes from the shared registry and is reloaded
+automatically when generate_models.py rewrites models/.
+
+Endpoints:
+    POST /predict   {"question": "..."}  or  {"title": "...", "body": "..."}
+                    or {"questions": ["...", ...]}
+    GET  /health    model status
+    GET  /metrics   request / batch counters and latency percentiles
+
+Usage:
+    python serve.py [--host 127.0.0.1] [--port 8600]
+                    [--max-batch-size 64] [--max-wait-ms 5]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import concurrent.futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from batching import MicroBatcher
+from model_registry import MODEL_DIR, get_model, model_available
+
+# ── Configuration ────────────────────────────────────────────────────────────
+HOST = "127.0.0.1"
+PORT = 8600
+MAX_BATCH_SIZE = 64        # questions per model call
+MAX_WAIT_MS = 5.0          # how long the first queued question waits for company
+REQUEST_TIMEOUT = 30.0     # seconds a request may wait for its batch
+MAX_BODY_BYTES = 1 << 20   # 1 MiB per request
+MAX_QUESTIONS = 1000       # per /predict call with "questions"
+
+
+def make_batch_fn(model_dir: str):
+    def predict_batch(texts: list) -> list:
+        model = get_model(model_dir)   # cheap stat check; picks up retrained models
+        labels, proba = model.predict_with_proba(model.clean(texts))
+        classes = [str(c) for c in model.classes_]
+        return [
+            {
+                "difficulty": str(label),
+                "probabilities": {c: round(float(p), 6) for c, p in zip(classes, row)},
+                "model_version": model.version,
+            }
+            for label, row in zip(labels, proba)
+        ]
+    return predict_batch
+
+
+def _question_text(payload: dict) -> str:
+    if "question" in payload:
+        return str(payload["question"] or "")
+    return f"{payload.get('title') or ''} {payload.get('body') or ''}".strip()
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    server_version = "DifficultyService/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        if self.path == "/health":
+            try:
+                model = get_model(self.server.model_dir)
+            except Exception as e:
+                self._send_json(503, {"status": "error", "error": str(e)})
+                return
+            self._send_json(200, {
+                "status": "ok",
+                "model_version": model.version,
+                "model_backend": model.backend,
+                "classes": [str(c) for c in model.classes_],
+                "uptime_s": round(time.time() - self.server.started_at, 1),
+            })
+        elif self.path == "/metrics":
+            self._send_json(200, self.server.batcher.stats())
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BODY_BYTES:
+            self._send_json(413 if length > MAX_BODY_BYTES else 400, {"error": "Missing or oversized request body"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(length))
+            if not isinstance(payload, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid JSON: {e}"})
+            return
+
+        batcher = self.server.batcher
+        try:
+            if "questions" in payload:
+                questions = payload["questions"]
+                if not isinstance(questions, list) or len(questions) > MAX_QUESTIONS:
+                    self._send_json(400, {"error": f"'questions' must be a list of at most {MAX_QUESTIONS} strings"})
+                    return
+                results = batcher.submit_many([str(q or "") for q in questions], timeout=REQUEST_TIMEOUT)
+                self._send_json(200, {"predictions": results})
+            else:
+                self._send_json(200, batcher.submit(_question_text(payload), timeout=REQUEST_TIMEOUT))
+        except concurrent.futures.TimeoutError:
+            self._send_json(503, {"error": "Timed out waiting for the model"})
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+
+class DifficultyServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128   # listen backlog; the default of 5 resets bursts of clients
+
+
+def create_server(host: str = HOST, port: int = PORT, model_dir: str = MODEL_DIR,
+                  max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS,
+                  quiet: bool = False) -> DifficultyServer:
+    server = DifficultyServer((host, port), PredictionHandler)
+    server.model_dir = model_dir
+    server.quiet = quiet
+    server.started_at = time.time()
+    server.batcher = MicroBatcher(make_batch_fn(model_dir), max_batch_size, max_wait_ms)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the difficulty classifier over HTTP.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--model-dir", default=MODEL_DIR,
+                        help=f"directory with the trained model (default {MODEL_DIR})")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE,
+                        help=f"questions per model call (default {MAX_BATCH_SIZE})")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help=f"max time a request waits for a batch to fill (default {MAX_WAIT_MS})")
+    parser.add_argument("--quiet", action="store_true", help="don't log every request")
+    args = parser.parse_args()
+
+    if not model_available(args.model_dir):
+        print(f"❌ No trained model in {args.model_dir}/ — run generate_models.py first.")
+        sys.exit(1)
+
+    server = create_server(args.host, args.port, args.model_dir,
+                           args.max_batch_size, args.max_wait_ms, args.quiet)
+    model = get_model(args.model_dir)   # load before accepting traffic
+    print(f"✅ Model {model.version} ({model.backend}) loaded")
+    print(f"Serving on http://{args.host}:{args.port}  (POST /predict, GET /health, GET /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.batcher.stop()
+        server.server_close()
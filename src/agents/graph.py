@@ -1,19 +1,126 @@
 """
 graph.py — Pipeline Orchestrator
-Chains all 4 agents in order using plain function calls (no LangGraph).
+Runs the 4 agents as a dependency graph on an asyncio runner (no LangGraph).
 
 Pipeline flow:
   difficulty_dict
       → run_analyzer_agent   → state["problems"]
       → run_retriever_agent  → state["principles"]
-      → recommend_agent       → state["recommendations"]
-      → generate_report      → markdown string  (returned, not written to state)
+      → arecommend_agent      → state["recommendations"]
+      → generate_report      → state["report"]  (markdown string)
+
+Stages only wait for the state keys they read (see agents/runner.py). The
+only independent work is at the start: the RAG warm-up (embedding model,
+knowledge-base index and search backend) and the topic section of the
+prompt run concurrently with the analyzer. Retriever → recommender →
+reporter is a strict chain, each needing the previous stage's output. The
+LLM call is non-blocking, bounded by LLM_TIMEOUT, and cancelled if the
+pipeline is cancelled. The recommender streams: each recommendation is
+reported as a "progress" event as soon as its line arrives.
+
+`run_pipeline_batch` produces reports for many exams in one run: one
+batched retrieval encode for all exams, then one LLM call per distinct
+prompt, fanned out with bounded concurrency.
 """
 
-from agents.analyzer  import run_analyzer_agent
-from agents.retriever import run_retriever_agent
-from agents.recommend import recommend_agent
-from agents.reporter  import generate_report
+import asyncio
+import os
+
+try:
+    from .analyzer  import run_analyzer_agent
+    from .retriever import run_retriever_agent, run_retriever_agent_batch
+    from .recommend import arecommend_agent, format_topic_data, recommendation_key, LLM_TIMEOUT
+    from .reporter  import generate_report
+    from .runner    import PipelineRunner, Stage, run_sync
+except ImportError:
+    from agents.analyzer  import run_analyzer_agent
+    from agents.retriever import run_retriever_agent, run_retriever_agent_batch
+    from agents.recommend import arecommend_agent, format_topic_data, recommendation_key, LLM_TIMEOUT
+    from agents.reporter  import generate_report
+    from agents.runner    import PipelineRunner, Stage, run_sync
+
+
+# Concurrent LLM requests in run_pipeline_batch (provider rate limits)
+BATCH_LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+
+
+def _warm_up_retriever(state: dict) -> dict:
+    """
+    Load the sentence-transformer, the knowledge-base index and its search
+    backend ahead of the retriever (no-op if RAG is not installed). The
+    retriever does not wait for this stage; if it gets there first it simply
+    shares the loads in progress.
+    """
+    try:
+        from rag.embedder import get_model, is_loaded, model_name, warm_up
+        from rag.index import get_index
+        from rag.retriever import KNOWLEDGE_BASE_PATH
+        from rag.search import get_backend
+
+        if not is_loaded():
+            warm_up()
+        get_backend(get_index(KNOWLEDGE_BASE_PATH, get_model(), model_name()))
+    except ImportError:
+        pass
+    return state
+
+
+def _assemble_topic_text(state: dict) -> dict:
+    state["topic_text"] = format_topic_data(state.get("topic_analysis", {}))
+    return state
+
+
+async def _stream_recommendations(state: dict, on_item) -> dict:
+    return await arecommend_agent(state, on_line=on_item)
+
+
+def _run_reporter(state: dict) -> dict:
+    state["report"] = generate_report(state)
+    return state
+
+
+PIPELINE_STAGES = [
+    Stage("warm_up", _warm_up_retriever, optional=True,
+          label="Loading embedding model and knowledge-base index"),
+    Stage("analyzer", run_analyzer_agent, inputs=("difficulty",), outputs=("problems",),
+          label="Agent 1 — Analyzer: Detecting difficulty problems"),
+    Stage("topic_text", _assemble_topic_text, inputs=("topic_analysis",), outputs=("topic_text",),
+          label="Assembling topic data for the prompt"),
+    Stage("retriever", run_retriever_agent, inputs=("problems",), outputs=("principles",),
+          label="Agent 2 — Retriever: Fetching pedagogical principles via RAG"),
+    Stage("recommender", _stream_recommendations, inputs=("problems", "principles", "topic_text"),
+          outputs=("recommendations",), timeout=LLM_TIMEOUT + 5, streaming=True,
+          label="Agent 3 — Recommender: Generating recommendations via LLM"),
+    Stage("reporter", _run_reporter, inputs=("problems", "principles", "recommendations"),
+          outputs=("report",), label="Agent 4 — Reporter: Formatting structured report"),
+]
+
+pipeline = PipelineRunner(PIPELINE_STAGES)
+
+
+def _print_event(event: str, stage: Stage, state: dict, info: dict):
+    if event == "start" and not stage.background:
+        print(f"▶ {stage.label or stage.name}...")
+    elif event == "progress":
+        print(f"   {stage.name}: {info['item']}")
+    elif event == "done":
+        key = stage.outputs[0] if stage.outputs else None
+        value = state.get(key)
+        detail = f"{len(value)} {key}" if isinstance(value, list) else "done"
+        print(f"   {stage.name}: {detail} ({info['seconds']:.2f}s)")
+    elif event == "failed":
+        print(f"   ⚠ {stage.name} failed: {info['error']}")
+
+
+async def run_pipeline_async(difficulty_dict: dict, topic_analysis: dict = None,
+                             metadata: dict = None, on_event=_print_event) -> dict:
+    """Run the pipeline on the current event loop and return the final state (report in state["report"])."""
+    state = {
+        "difficulty": difficulty_dict,
+        "topic_analysis": topic_analysis or {},
+        "metadata": metadata or {},
+    }
+    return await pipeline.run(state, on_event=on_event)
 
 
 def run_pipeline(difficulty_dict: dict, topic_analysis: dict = None) -> str:
@@ -27,33 +134,75 @@ def run_pipeline(difficulty_dict: dict, topic_analysis: dict = None) -> str:
     Returns:
         A Markdown-formatted assessment quality report string.
     """
-    # Build initial state
-    state = {
-        "difficulty": difficulty_dict,
-        "topic_analysis": topic_analysis or {},
+    state = run_sync(run_pipeline_async(difficulty_dict, topic_analysis))
+    print("   Report generated.\n")
+    return state["report"]
+
+
+def _exam_state(exam: dict) -> dict:
+    """Accept either a bare difficulty dict or {"difficulty", "topic_analysis", "metadata"}."""
+    if "difficulty" not in exam:
+        exam = {"difficulty": exam}
+    return {
+        "difficulty": exam["difficulty"],
+        "topic_analysis": exam.get("topic_analysis") or {},
+        "metadata": exam.get("metadata") or {},
     }
 
-    # Agent 1 — Analyze difficulty and identify problems
-    print("▶ Running Agent 1: Analyzer...")
-    state = run_analyzer_agent(state)
-    print(f"   Problems found: {len(state.get('problems', []))}")
 
-    # Agent 2 — Retrieve relevant pedagogical principles
-    print("▶ Running Agent 2: Retriever...")
-    state = run_retriever_agent(state)
-    print(f"   Principles retrieved: {len(state.get('principles', []))}")
+async def run_pipeline_batch_async(exams: list, max_concurrency: int = BATCH_LLM_CONCURRENCY,
+                                   on_report=None) -> list:
+    """
+    Run the pipeline for many exams and return their final states, in order.
 
-    # Agent 3 — Generate recommendations
-    print("▶ Running Agent 3: Recommender...")
-    state = recommend_agent(state)
-    print(f"   Recommendations generated: {len(state.get('recommendations', []))}")
+    Exams with the same prompt share one in-flight recommendation call (the
+    LLM cache only helps once a call has finished). `on_report(i, state)` is
+    called as each exam's report completes.
+    """
+    states = [_exam_state(exam) for exam in exams]
+    for state in states:
+        run_analyzer_agent(state)
+        _assemble_topic_text(state)
 
-    # Agent 4 — Generate final report (returns markdown string, not written to state)
-    print("▶ Running Agent 4: Reporter...")
-    report = generate_report(state)
-    print("   Report generated.\n")
+    # One encode for the (de-duplicated) queries of every exam
+    states = await asyncio.to_thread(run_retriever_agent_batch, states)
 
-    return report
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    in_flight = {}   # recommendation_key -> task producing the recommendations
+
+    async def recommend(state: dict) -> list:
+        async with semaphore:
+            return (await arecommend_agent(state))["recommendations"]
+
+    async def finish(i: int, state: dict) -> dict:
+        key = recommendation_key(state)
+        task = in_flight.get(key)
+        if task is None:
+            task = in_flight[key] = asyncio.ensure_future(recommend(dict(state)))
+        state["recommendations"] = list(await task)
+        state = _run_reporter(state)
+        if on_report:
+            on_report(i, state)
+        return state
+
+    return await asyncio.gather(*(finish(i, s) for i, s in enumerate(states)))
+
+
+def run_pipeline_batch(exams: list, max_concurrency: int = BATCH_LLM_CONCURRENCY) -> list:
+    """
+    Generate reports for many exams in one pipeline run.
+
+    Args:
+        exams: difficulty dicts, or dicts with "difficulty" and optional
+               "topic_analysis" / "metadata" keys.
+        max_concurrency: LLM requests in flight at once.
+
+    Returns:
+        One Markdown report per exam, in input order.
+    """
+    states = run_sync(run_pipeline_batch_async(exams, max_concurrency))
+    print(f"   {len(states)} report(s) generated.\n")
+    return [state["report"] for state in states]
 
 
 # ── Quick test ────────────────────────────────────────────────────────────────
@@ -0,0 +1,144 @@
+"""
+llm_cache.py — Persistent cache of LLM recommendations (SQLite).
+
+Entries are keyed by a fingerprint of the model name and the prompt with
+whitespace normalized, so an exam profile that produces the same problems,
+principles and topic data is answered from disk instead of the LLM. The
+analyzer emits a small set of canned problem strings, so repeats are common.
+
+- entries older than the TTL are ignored and purged
+- when the table grows past `max_entries`, the least recently used
+  entries are evicted
+- hit / miss / store / eviction counters are kept per process (`stats()`)
+
+Configuration (environment):
+    LLM_CACHE             "0" disables the cache (default enabled)
+    LLM_CACHE_PATH        SQLite file (default data/cache/llm_cache.sqlite)
+    LLM_CACHE_TTL         seconds an entry stays valid (default 7 days)
+    LLM_CACHE_MAX_ENTRIES entries kept before LRU eviction (default 5000)
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join("data", "cache", "llm_cache.sqlite")
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recommendations (
+    key         TEXT PRIMARY KEY,
+    model       TEXT NOT NULL,
+    value       TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    hits        INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+def prompt_fingerprint(prompt: str, model: str) -> str:
+    """Stable key for (model, prompt); indentation and line wrapping do not matter."""
+    normalized = _WHITESPACE_RE.sub(" ", prompt).strip()
+    return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class RecommendationCache:
+    def __init__(self, path: str = DEFAULT_PATH, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON recommendations(accessed_at)")
+
+    def get(self, key: str):
+        """Cached recommendations for `key`, or None if absent or expired."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM recommendations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM recommendations WHERE key = ?", (key,))
+                self._counters["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE recommendations SET accessed_at = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            self._counters["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, model: str, recommendations: list):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO recommendations (key, model, value, created_at, accessed_at, hits) "
+                "VALUES (?, ?, ?, ?, ?, 0)",
+                (key, model, json.dumps(recommendations), now, now),
+            )
+            self._counters["stores"] += 1
+            self._evict(now)
+
+    def _evict(self, now: float):
+        expired = self._conn.execute(
+            "DELETE FROM recommendations WHERE created_at < ?", (now - self.ttl,)
+        ).rowcount
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM recommendations").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM recommendations WHERE key IN "
+                "(SELECT key FROM recommendations ORDER BY accessed_at ASC LIMIT ?)", (overflow,)
+            )
+        self._counters["evictions"] += max(expired, 0) + max(overflow, 0)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM recommendations")
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM recommendations").fetchone()
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        counters["entries"] = entries
+        counters["hit_rate"] = round(counters["hits"] / lookups, 3) if lookups else 0.0
+        return counters
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache configured from the environment, or None when disabled."""
+    global _cache
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RecommendationCache(
+                    path=os.getenv("LLM_CACHE_PATH") or DEFAULT_PATH,
+                    ttl=float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL)),
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                )
+    return _cache
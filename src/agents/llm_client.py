@@ -0,0 +1,345 @@
+"""
+llm_client.py — Shared Groq clients with deadlines, retries and a circuit breaker.
+
+One pooled HTTP client is reused for every completion (one per event loop
+for the async client; pipelines all run on the shared loop of
+agents/runner.py), so repeated reports keep their connections to the
+provider instead of opening a new one per call. Each completion has a total
+deadline that covers all of its attempts, and each attempt has its own
+shorter budget:
+
+- transient errors (attempt timeouts, connection errors, 429, 5xx) are
+  retried a bounded number of times with full-jitter exponential backoff,
+  never past the deadline (a Retry-After header is honoured when it fits)
+- other errors (bad key, bad request) fail immediately
+- after `LLM_BREAKER_THRESHOLD` consecutive failed completions the circuit
+  opens and calls fail fast for `LLM_BREAKER_COOLDOWN` seconds; then one
+  trial call is let through and closes the circuit again if it succeeds
+
+Every failure is raised as `LLMUnavailable`, which the recommender turns
+into the rule-based fallback. `astream` yields the completion as it
+arrives, for showing recommendations before the whole answer is in.
+
+Configuration (environment):
+    LLM_TIMEOUT            total seconds per completion, retries included (default 30)
+    LLM_ATTEMPT_TIMEOUT    seconds one attempt (or a stream's first chunk) may take before it is retried (default 12)
+    LLM_MAX_RETRIES        retries after the first attempt (default 2)
+    LLM_RETRY_BASE         first backoff in seconds (default 0.5)
+    LLM_RETRY_MAX          longest single backoff in seconds (default 4)
+    LLM_MAX_CONNECTIONS    pooled HTTP connections per client (default 16)
+    LLM_BREAKER_THRESHOLD  consecutive failures that open the circuit (default 5)
+    LLM_BREAKER_COOLDOWN   seconds the circuit stays open (default 30)
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+
+try:
+    import httpx
+    from groq import (
+        APIConnectionError,
+        AsyncGroq,
+        DefaultAsyncHttpxClient,
+        DefaultHttpxClient,
+        Groq,
+        InternalServerError,
+        RateLimitError,
+    )
+    _GROQ_AVAILABLE = True
+    # APIConnectionError includes the SDK's APITimeoutError
+    _TRANSIENT_ERRORS = (APIConnectionError, RateLimitError, InternalServerError, asyncio.TimeoutError)
+except ImportError:
+    _GROQ_AVAILABLE = False
+    _TRANSIENT_ERRORS = (asyncio.TimeoutError,)
+
+LLM_MODEL = "llama-3.3-70b-versatile"
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "12"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+RETRY_BASE = float(os.getenv("LLM_RETRY_BASE", "0.5"))
+RETRY_MAX = float(os.getenv("LLM_RETRY_MAX", "4"))
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "16"))
+BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+
+class LLMUnavailable(RuntimeError):
+    """The completion could not be produced; use the fallback."""
+
+
+# ── Circuit breaker ───────────────────────────────────────────────────────────
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.state = "closed"            # closed -> open -> half_open -> closed / open
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if a call may go to the provider (at most one trial call while half-open)."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """The trial call was abandoned (cancelled) without an outcome: allow a new trial."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self._opened_at = time.monotonic() - self.cooldown
+
+
+breaker = CircuitBreaker()
+
+_counters = {"calls": 0, "attempts": 0, "retries": 0, "failures": 0, "short_circuited": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name: str, n: int = 1):
+    with _counters_lock:
+        _counters[name] += n
+
+
+def llm_stats() -> dict:
+    with _counters_lock:
+        stats = dict(_counters)
+    stats["circuit"] = breaker.state
+    return stats
+
+
+# ── Pooled clients ────────────────────────────────────────────────────────────
+def _api_key() -> str:
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise LLMUnavailable("GROQ_API_KEY not set")
+    return api_key
+
+
+def _limits():
+    return httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+
+
+_sync_client = None                              # (api_key, Groq)
+_async_clients = weakref.WeakKeyDictionary()     # event loop -> (api_key, AsyncGroq)
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide Groq client (SDK retries off; retries are handled here)."""
+    global _sync_client
+    if not _GROQ_AVAILABLE:
+        raise LLMUnavailable("groq is not installed")
+    api_key = _api_key()
+    with _client_lock:
+        if _sync_client is None or _sync_client[0] != api_key:
+            client = Groq(api_key=api_key, max_retries=0, timeout=LLM_TIMEOUT,
+                          http_client=DefaultHttpxClient(limits=_limits()))
+            _sync_client = (api_key, client)
+        return _sync_client[1]
+
+
+def get_async_client():
+    """AsyncGroq client for the running event loop (connections can't cross loops)."""
+    if not _GROQ_AVAILABLE:
+        raise LLMUnavailable("groq is not installed")
+    api_key = _api_key()
+    loop = asyncio.get_running_loop()
+    with _client_lock:
+        entry = _async_clients.get(loop)
+        if entry is None or entry[0] != api_key:
+            client = AsyncGroq(api_key=api_key, max_retries=0, timeout=LLM_TIMEOUT,
+                               http_client=DefaultAsyncHttpxClient(limits=_limits()))
+            entry = _async_clients[loop] = (api_key, client)
+        return entry[1]
+
+
+# ── Retry policy ──────────────────────────────────────────────────────────────
+def _backoff(attempt: int, error: Exception) -> float:
+    """Full-jitter exponential backoff, or the provider's Retry-After if it sent one."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(float(retry_after), RETRY_MAX)
+    except (TypeError, ValueError):
+        return random.uniform(0, min(RETRY_MAX, RETRY_BASE * 2 ** attempt))
+
+
+def _next_delay(attempt: int, error: Exception, deadline: float):
+    """Seconds to wait before the next attempt, or None if it should not be retried."""
+    if not isinstance(error, _TRANSIENT_ERRORS) or attempt >= MAX_RETRIES:
+        return None
+    delay = _backoff(attempt, error)
+    if time.monotonic() + delay >= deadline:
+        return None
+    return delay
+
+
+def _attempt_timeout(deadline: float) -> float:
+    """Seconds the next attempt may take: its own budget, capped by what is left of the deadline."""
+    return max(0.1, min(ATTEMPT_TIMEOUT, deadline - time.monotonic()))
+
+
+def _short_circuit():
+    if not breaker.allow():
+        _count("short_circuited")
+        raise LLMUnavailable("circuit open")
+
+
+def _failed(error: Exception):
+    breaker.record_failure()
+    _count("failures")
+    raise LLMUnavailable(type(error).__name__) from error
+
+
+def _messages(prompt: str) -> list:
+    return [{"role": "user", "content": prompt}]
+
+
+def complete(prompt: str, model: str = LLM_MODEL, timeout: float = LLM_TIMEOUT) -> str:
+    """Completion text for `prompt`; raises LLMUnavailable on failure or an open circuit."""
+    client = get_client()
+    _short_circuit()
+    _count("calls")
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        _count("attempts")
+        try:
+            response = client.chat.completions.create(
+                model=model,
+                messages=_messages(prompt),
+                timeout=_attempt_timeout(deadline),
+            )
+            breaker.record_success()
+            return response.choices[0].message.content
+        except Exception as e:
+            delay = _next_delay(attempt, e, deadline)
+            if delay is None:
+                _failed(e)
+        _count("retries")
+        time.sleep(delay)
+        attempt += 1
+
+
+async def acomplete(prompt: str, model: str = LLM_MODEL, timeout: float = LLM_TIMEOUT) -> str:
+    """Async `complete`; the deadline is enforced on the event loop and cancellation propagates."""
+    client = get_async_client()
+    _short_circuit()
+    _count("calls")
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    try:
+        while True:
+            _count("attempts")
+            budget = _attempt_timeout(deadline)
+            try:
+                response = await asyncio.wait_for(
+                    client.chat.completions.create(
+                        model=model,
+                        messages=_messages(prompt),
+                        timeout=budget,
+                    ),
+                    timeout=budget,
+                )
+                breaker.record_success()
+                return response.choices[0].message.content
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = _next_delay(attempt, e, deadline)
+                if delay is None:
+                    _failed(e)
+            _count("retries")
+            await asyncio.sleep(delay)
+            attempt += 1
+    except asyncio.CancelledError:
+        breaker.release()
+        raise
+
+
+async def astream(prompt: str, model: str = LLM_MODEL, timeout: float = LLM_TIMEOUT):
+    """
+    Yield the completion text in chunks as the provider streams it.
+
+    The deadline covers the whole stream; the attempt budget covers only
+    the wait for the first chunk, so later chunks may arrive further apart
+    than `LLM_ATTEMPT_TIMEOUT`. Failures before the first chunk are retried
+    like `acomplete`; once text has been yielded a failure raises
+    LLMUnavailable, since the consumer already has part of the answer.
+    """
+    client = get_async_client()
+    _short_circuit()
+    _count("calls")
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    started = False
+    try:
+        while True:
+            _count("attempts")
+            try:
+                budget = _attempt_timeout(deadline)
+                attempt_deadline = time.monotonic() + budget
+                # the SDK timeout is also the read timeout between chunks, so
+                # it gets the rest of the deadline; the attempt budget only
+                # bounds the wait for the first chunk, with wait_for below
+                stream = await asyncio.wait_for(
+                    client.chat.completions.create(
+                        model=model,
+                        messages=_messages(prompt),
+                        stream=True,
+                        timeout=max(0.1, deadline - time.monotonic()),
+                    ),
+                    timeout=budget,
+                )
+                try:
+                    chunks = stream.__aiter__()
+                    while True:
+                        remaining = (deadline if started else attempt_deadline) - time.monotonic()
+                        if remaining <= 0:
+                            raise asyncio.TimeoutError()
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining)
+                        except StopAsyncIteration:
+                            break
+                        text = chunk.choices[0].delta.content if chunk.choices else None
+                        if text:
+                            started = True
+                            yield text
+                finally:
+                    await stream.close()
+                breaker.record_success()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = None if started else _next_delay(attempt, e, deadline)
+                if delay is None:
+                    _failed(e)
+            _count("retries")
+            await asyncio.sleep(delay)
+            attempt += 1
+    except (asyncio.CancelledError, GeneratorExit):
+        breaker.release()
+        raise
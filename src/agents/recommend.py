@@ -1,10 +1,13 @@
-import os
+import asyncio
 
 try:
-    from groq import Groq
-    _GROQ_AVAILABLE = True
+    from .llm_cache import get_cache, prompt_fingerprint
+    from .llm_client import LLM_MODEL, LLM_TIMEOUT, LLMUnavailable, acomplete, astream, complete
+    from .runner import run_sync_with_events
 except ImportError:
-    _GROQ_AVAILABLE = False
+    from agents.llm_cache import get_cache, prompt_fingerprint
+    from agents.llm_client import LLM_MODEL, LLM_TIMEOUT, LLMUnavailable, acomplete, astream, complete
+    from agents.runner import run_sync_with_events
 
 
 def _fallback_recommendations(problems: list, state: dict = None) -> list:
@@ -41,23 +44,23 @@ def _fallback_recommendations(problems: list, state: dict = None) -> list:
     return recs[:3]
 
 
-def recommend_agent(state: dict) -> dict:
-    """
-    Agent 3 - Recommender.
-    Generates actionable recommendations based on identified problems and 
-    retrieved pedagogical principles.
-    """
-    problems = state.get("problems", [])
-    principles = state.get("principles", [])
-    topic_analysis = state.get("topic_analysis", {})
-
+def format_topic_data(topic_analysis: dict) -> str:
+    """Topic-level lines of the prompt; independent of the problems/principles."""
     topic_text_lines = []
     if topic_analysis:
         for topic, data in topic_analysis.items():
             topic_text_lines.append(f"- {topic}: Avg Score {data.get('score', 0)} ({data.get('difficulty', 'Unknown')})")
-    topic_text = "\n".join(topic_text_lines) if topic_text_lines else "None provided"
+    return "\n".join(topic_text_lines) if topic_text_lines else "None provided"
+
 
-    prompt = f"""
+def build_prompt(state: dict) -> str:
+    problems = state.get("problems", [])
+    principles = state.get("principles", [])
+    topic_text = state.get("topic_text")
+    if topic_text is None:
+        topic_text = format_topic_data(state.get("topic_analysis", {}))
+
+    return f"""
         You are an expert in educational assessment design.
         Problems identified in the exam:
         {chr(10).join(f"- {p}" for p in problems)}
@@ -78,26 +81,162 @@ def recommend_agent(state: dict) -> dict:
         - STRICT: Do not claim specific student failure rates unless the data explicitly shows them
         - Base every recommendation only on the Problems and Topic Data given above"""
 
+
+def recommendation_key(state: dict) -> tuple:
+    """Exams with equal keys get identical recommendations: same prompt, same fallback."""
+    fallback = _fallback_recommendations(state.get("problems", []), state)
+    return build_prompt(state), tuple(fallback)
+
+
+def _parse_recommendations(content: str) -> list:
+    return [line.strip() for line in content.strip().split("\n") if line.strip()]
+
+
+def _unavailable(error: Exception) -> str:
+    return str(error) if isinstance(error, LLMUnavailable) else type(error).__name__
+
+
+def _cache_lookup(prompt: str) -> tuple:
+    """(cache, key, cached recommendations or None); the cache never fails a run."""
+    try:
+        cache = get_cache()
+        if cache is None:
+            return None, None, None
+        key = prompt_fingerprint(prompt, LLM_MODEL)
+        return cache, key, cache.get(key)
+    except Exception as e:
+        print(f"   ⚠ Recommendation cache unavailable ({type(e).__name__})")
+        return None, None, None
+
+
+def _cache_store(cache, key: str, recommendations: list):
+    if cache is not None:
+        try:
+            cache.put(key, LLM_MODEL, recommendations)
+        except Exception as e:
+            print(f"   ⚠ Could not cache recommendations ({type(e).__name__})")
+
+
+def recommend_agent(state: dict, on_line=None) -> dict:
+    """
+    Agent 3 - Recommender.
+    Generates actionable recommendations based on identified problems and 
+    retrieved pedagogical principles.
+
+    With `on_line`, the completion is streamed and `on_line(line)` is called
+    for each recommendation as soon as it arrives.
+    """
+    if on_line is not None:
+        return run_sync_with_events(lambda emit: arecommend_agent(state, on_line=emit), on_line)
+
+    prompt = build_prompt(state)
+    cache, key, cached = _cache_lookup(prompt)
+    if cached is not None:
+        print("   (Recommendations served from cache)")
+        state["recommendations"] = cached
+        return state
+
+    try:
+        recommendations = _parse_recommendations(complete(prompt))
+        print("   (LLM recommendations generated via Groq)")
+        _cache_store(cache, key, recommendations)
+
+    except Exception as e:
+        print(f"   ⚠ LLM unavailable ({_unavailable(e)}), using rule-based fallback.")
+        recommendations = _fallback_recommendations(state.get("problems", []), state)
+
+    state["recommendations"] = recommendations
+    return state
+
+
+async def astream_recommendations(state: dict, timeout: float = LLM_TIMEOUT):
+    """
+    Streaming mode of Agent 3: yield recommendation lines as they arrive.
+
+    Cached recommendations are yielded at once and LLM output line by line.
+    If the LLM fails before the first line the rule-based fallback is
+    yielded instead; if it fails mid-answer the lines so far are kept.
+    Only complete answers are cached.
+    """
+    prompt = build_prompt(state)
+    cache, key, cached = _cache_lookup(prompt)
+    if cached is not None:
+        print("   (Recommendations served from cache)")
+        for line in cached:
+            yield line
+        return
+
+    lines = []
+    buffer = ""
+    chunks = astream(prompt, timeout=timeout)
+    try:
+        async for text in chunks:
+            buffer += text
+            if "\n" not in buffer:
+                continue
+            finished, buffer = buffer.rsplit("\n", 1)
+            for line in _parse_recommendations(finished):
+                lines.append(line)
+                yield line
+        for line in _parse_recommendations(buffer):
+            lines.append(line)
+            yield line
+        if not lines:
+            raise LLMUnavailable("empty completion")
+    except Exception as e:
+        if lines:
+            print(f"   ⚠ LLM stream interrupted ({_unavailable(e)}), keeping {len(lines)} recommendation(s).")
+            return
+        print(f"   ⚠ LLM unavailable ({_unavailable(e)}), using rule-based fallback.")
+        for line in _fallback_recommendations(state.get("problems", []), state):
+            yield line
+        return
+    finally:
+        await chunks.aclose()
+
+    print("   (LLM recommendations generated via Groq)")
+    _cache_store(cache, key, lines)
+
+
+async def arecommend_agent(state: dict, timeout: float = LLM_TIMEOUT, on_line=None) -> dict:
+    """
+    Non-blocking Agent 3 for the async pipeline (agents/runner.py).
+
+    The completion goes through the pooled client in agents/llm_client.py
+    (total deadline, retries, circuit breaker); when it fails or the
+    circuit is open the rule-based fallback is used. Cancellation of the
+    surrounding task abandons the HTTP request and propagates.
+    With `on_line`, recommendations are streamed (see astream_recommendations).
+    """
+    if on_line is not None:
+        recommendations = []
+        lines = astream_recommendations(state, timeout)
+        try:
+            async for line in lines:
+                recommendations.append(line)
+                on_line(line)
+        finally:
+            await lines.aclose()
+        state["recommendations"] = recommendations
+        return state
+
+    prompt = build_prompt(state)
+    cache, key, cached = _cache_lookup(prompt)
+    if cached is not None:
+        print("   (Recommendations served from cache)")
+        state["recommendations"] = cached
+        return state
+
     try:
-        if not _GROQ_AVAILABLE:
-            raise RuntimeError("groq not installed")
-
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise RuntimeError("GROQ_API_KEY not set")
-
-        client = Groq(api_key=api_key)
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        result = response.choices[0].message.content.strip().split("\n")
-        recommendations = [line.strip() for line in result if line.strip()]
+        recommendations = _parse_recommendations(await acomplete(prompt, timeout=timeout))
         print("   (LLM recommendations generated via Groq)")
+        _cache_store(cache, key, recommendations)
 
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
-        print(f"   ⚠ LLM unavailable ({type(e).__name__}), using rule-based fallback.")
-        recommendations = _fallback_recommendations(problems, state)
+        print(f"   ⚠ LLM unavailable ({_unavailable(e)}), using rule-based fallback.")
+        recommendations = _fallback_recommendations(state.get("problems", []), state)
 
     state["recommendations"] = recommendations
     return state
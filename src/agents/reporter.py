@@ -6,17 +6,21 @@ report suitable for both UI display and PDF export.
 import datetime
 
 
-def generate_report(state: dict) -> str:
+def format_recommendation(line: str) -> str:
+    return f"- {line}\n"
+
+
+def report_parts(state: dict) -> tuple:
     """
-    Agent 4 - Reporter.
-    Creates a detailed Markdown report from the pipeline state data, 
-    including metrics on difficulty distribution, topic performance, 
-    and pedagogical improvement recommendations.
+    The report split around the recommendation bullets: (head, tail).
+
+    Only needs the problems and principles, so the report can be shown
+    while the recommendations are still streaming in:
+    head + format_recommendation(line) for each line + tail.
     """
     difficulty_dist = state.get("difficulty", {"Easy": "0%", "Medium": "0%", "Hard": "0%"})
     problems = state.get("problems", ["No problems identified."])
     principles = state.get("principles", ["No principles retrieved."])
-    recommendations = state.get("recommendations", ["No recommendations available."])
     topic_analysis = state.get("topic_analysis", {})
 
     total = difficulty_dist.get("total", 1)
@@ -67,17 +71,27 @@ Based on the provided metrics and AI analysis, the assessment has been evaluated
 
     section_num += 1
     report_md += f"\n## {section_num}. Recommended Assessment Improvements\n"
-    for r in recommendations:
-        report_md += f"- {r}\n"
 
     section_num += 1
-    report_md += f"\n## {section_num}. Supporting Pedagogical References\n"
+    tail_md = f"\n## {section_num}. Supporting Pedagogical References\n"
     for pr in principles:
-        report_md += f"- {pr}\n"
+        tail_md += f"- {pr}\n"
 
     section_num += 1
-    report_md += f"""
+    tail_md += f"""
 ## {section_num}. Educational and Ethical Disclaimers
 *Disclaimer: This report is generated by an AI assistant intended to serve as a **supportive tool for educators**. It does not replace professional pedagogical judgment. Ensure that the incorporated recommendations align with your institution's specific curriculum standards and ethical guidelines.*
 """
-    return report_md
+    return report_md, tail_md
+
+
+def generate_report(state: dict) -> str:
+    """
+    Agent 4 - Reporter.
+    Creates a detailed Markdown report from the pipeline state data, 
+    including metrics on difficulty distribution, topic performance, 
+    and pedagogical improvement recommendations.
+    """
+    recommendations = state.get("recommendations", ["No recommendations available."])
+    head, tail = report_parts(state)
+    return head + "".join(format_recommendation(r) for r in recommendations) + tail
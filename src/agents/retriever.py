@@ -1,22 +1,38 @@
+import os
+
+# One query per problem, fused with RRF, instead of one combined query (opt-in)
+MULTI_QUERY = os.getenv("RAG_MULTI_QUERY", "0") == "1"
+
+_FALLBACK_PRINCIPLES = [
+    "A well-balanced exam should have 30% Easy, 40% Medium, 30% Hard questions.",
+    "Bloom's Taxonomy suggests evaluating recall, understanding, and application.",
+    "Assessments should begin with easier questions to build student confidence.",
+]
+
+_NO_PROBLEMS = "No problems identified — exam appears well-balanced."
+
 try:
-    from rag.retriever import retrieve_relevant_principles
+    from rag.retriever import retrieve_relevant_principles, retrieve_relevant_principles_batch
 except ImportError:
-    def retrieve_relevant_principles(problems, top_k=3):
-        return [
-            "A well-balanced exam should have 30% Easy, 40% Medium, 30% Hard questions.",
-            "Bloom's Taxonomy suggests evaluating recall, understanding, and application.",
-            "Assessments should begin with easier questions to build student confidence.",
-        ]
+    def retrieve_relevant_principles(problems, top_k=3, backend=None, multi_query=False):
+        return list(_FALLBACK_PRINCIPLES)
+
+    def retrieve_relevant_principles_batch(problem_lists, top_k=3, backend=None, multi_query=False):
+        return [list(_FALLBACK_PRINCIPLES) for _ in problem_lists]
 
 
 def run_retriever_agent(state: dict) -> dict:
     problems = state.get("problems", [])
 
     if not problems:
-        state["principles"] = ["No problems identified — exam appears well-balanced."]
+        state["principles"] = [_NO_PROBLEMS]
         return state
 
-    principles = retrieve_relevant_principles(problems, top_k=3)
+    try:
+        principles = retrieve_relevant_principles(problems, top_k=3, multi_query=MULTI_QUERY)
+    except ImportError:
+        # sentence-transformers is loaded lazily, so a missing install surfaces here
+        principles = list(_FALLBACK_PRINCIPLES)
     state["principles"] = principles
 
     print("Agent 2 — Retrieved Principles:")
@@ -24,3 +40,18 @@ def run_retriever_agent(state: dict) -> dict:
         print(f"  → {p}")
 
     return state
+
+
+def run_retriever_agent_batch(states: list) -> list:
+    """Agent 2 for many exams: every exam's queries are encoded in one batch."""
+    problem_lists = [state.get("problems", []) for state in states]
+    try:
+        results = retrieve_relevant_principles_batch(problem_lists, top_k=3, multi_query=MULTI_QUERY)
+    except ImportError:
+        results = [list(_FALLBACK_PRINCIPLES) for _ in states]
+
+    for state, problems, principles in zip(states, problem_lists, results):
+        state["principles"] = principles if problems else [_NO_PROBLEMS]
+
+    print(f"Agent 2 — Retrieved principles for {len(states)} exam(s)")
+    return states
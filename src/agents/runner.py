@@ -0,0 +1,224 @@
+"""
+runner.py — Dependency-driven asyncio runner for the agent pipeline.
+
+Each `Stage` declares the state keys it reads (`inputs`) and writes
+(`outputs`). A stage starts as soon as every input is present in the state,
+so stages that do not depend on each other run concurrently; in the agent
+pipeline (agents/graph.py) that is the RAG warm-up overlapping the analyzer,
+while the later agents form a chain. Blocking stages run in worker threads;
+coroutine stages (the LLM call) run on the event loop and can be cancelled.
+Background stages (no outputs) are started on a daemon thread and never
+delay the result. Streaming stages (coroutines) are given an `on_item`
+callback and report partial output, e.g. recommendation lines as the LLM
+produces them, as "progress" events.
+
+Every stage receives a shallow copy of the state and only its declared
+outputs are merged back, so concurrent stages never see each other's
+half-written results.
+
+Synchronous callers (`run_sync`) all share one long-lived event loop on a
+daemon thread, so per-loop resources such as the pooled LLM client in
+agents/llm_client.py are reused across runs instead of being rebuilt (and
+leaked) by a fresh `asyncio.run` loop each time.
+"""
+
+import asyncio
+import concurrent.futures
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    fn: object                    # fn(state) -> state, sync or async
+    inputs: tuple = ()
+    outputs: tuple = ()
+    timeout: float = None         # seconds; None = no limit
+    optional: bool = False        # failures are reported, not raised
+    background: bool = False      # fire-and-forget side effect (e.g. warm-up); never awaited
+    streaming: bool = False       # async fn(state, on_item) reporting partial output
+    label: str = ""               # shown in progress output
+
+
+class PipelineError(RuntimeError):
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"stage '{stage}' failed: {type(error).__name__}: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class PipelineRunner:
+    def __init__(self, stages: list):
+        names = [s.name for s in stages]
+        if len(set(names)) != len(names):
+            raise ValueError("stage names must be unique")
+        for stage in stages:
+            if stage.background and (stage.outputs or asyncio.iscoroutinefunction(stage.fn)):
+                raise ValueError(f"background stage '{stage.name}' must be a sync function without outputs")
+            if stage.streaming and not asyncio.iscoroutinefunction(stage.fn):
+                raise ValueError(f"streaming stage '{stage.name}' must be a coroutine function")
+        self.stages = list(stages)
+
+    def _check(self, state: dict):
+        """Every input must be in the initial state or produced by some stage."""
+        available = set(state)
+        for stage in self.stages:
+            available.update(stage.outputs)
+        for stage in self.stages:
+            missing = set(stage.inputs) - available
+            if missing:
+                raise ValueError(f"stage '{stage.name}' needs {sorted(missing)}, which nothing produces")
+
+    async def _run_stage(self, stage: Stage, state: dict, notify) -> dict:
+        snapshot = dict(state)
+        if stage.streaming:
+            started = time.perf_counter()
+
+            def on_item(item):
+                notify("progress", stage, snapshot, {"item": item, "seconds": time.perf_counter() - started})
+
+            call = stage.fn(snapshot, on_item)
+        elif asyncio.iscoroutinefunction(stage.fn):
+            call = stage.fn(snapshot)
+        else:
+            call = asyncio.to_thread(stage.fn, snapshot)
+        result = await asyncio.wait_for(call, timeout=stage.timeout) if stage.timeout else await call
+        result = result if result is not None else snapshot
+        return {key: result[key] for key in stage.outputs if key in result}
+
+    @staticmethod
+    def _run_background(stage: Stage, state: dict):
+        try:
+            stage.fn(state)
+        except Exception:
+            pass   # best effort only; the stages that need it will surface the error
+
+    async def run(self, state: dict, on_event=None) -> dict:
+        """
+        Run every stage once and return the final state.
+
+        `on_event(event, stage, state, info)` is called on the event-loop
+        thread with event "start", "progress" (streaming stages), "done" or
+        "failed"; `info` holds the stage's elapsed seconds (and the error for
+        "failed", the partial output as "item" for "progress").
+        """
+        self._check(state)
+        state = dict(state)
+        pending = list(self.stages)
+        running = {}   # task -> (stage, start time)
+        notify = on_event or (lambda *args: None)
+
+        try:
+            while pending or running:
+                ready = [s for s in pending if all(k in state for k in s.inputs)]
+                for stage in ready:
+                    pending.remove(stage)
+                    notify("start", stage, state, {})
+                    if stage.background:
+                        threading.Thread(target=self._run_background, args=(stage, dict(state)),
+                                         name=stage.name, daemon=True).start()
+                        continue
+                    task = asyncio.create_task(self._run_stage(stage, state, notify), name=stage.name)
+                    running[task] = (stage, time.perf_counter())
+
+                if not running:
+                    if not pending:
+                        break
+                    # Only reachable if an optional stage that others depend on failed
+                    blocked = ", ".join(s.name for s in pending)
+                    raise PipelineError(blocked, RuntimeError("inputs never became available"))
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stage, started = running.pop(task)
+                    info = {"seconds": time.perf_counter() - started}
+                    try:
+                        state.update(task.result())
+                    except Exception as e:
+                        info["error"] = e
+                        notify("failed", stage, state, info)
+                        if not stage.optional:
+                            raise PipelineError(stage.name, e) from e
+                        continue
+                    notify("done", stage, state, info)
+        finally:
+            # On failure or cancellation, don't leave stages running behind us
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return state
+
+
+# ── Shared event loop ─────────────────────────────────────────────────────────
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def shared_loop() -> asyncio.AbstractEventLoop:
+    """The process-wide event loop that `run_sync` runs coroutines on (started on first use)."""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="pipeline-loop", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def _on_shared_loop() -> bool:
+    try:
+        return asyncio.get_running_loop() is _loop
+    except RuntimeError:
+        return False
+
+
+def _wait(future: concurrent.futures.Future, timeout: float = None):
+    try:
+        return future.result(timeout)
+    except BaseException:
+        # The caller was interrupted (or the result failed): don't leave the task running
+        future.cancel()
+        raise
+
+
+def run_sync(coro):
+    """Run `coro` to completion from synchronous code on the shared loop and return its result."""
+    if _on_shared_loop():
+        # Blocking the shared loop on itself would deadlock: use a private loop in a thread
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, coro).result()
+    return _wait(asyncio.run_coroutine_threadsafe(coro, shared_loop()))
+
+
+def run_sync_with_events(start, on_event):
+    """
+    Like `run_sync(start(emit))`, but `on_event` is called on *this* thread.
+
+    `start(emit)` must return the coroutine to run; every `emit(*args)` made
+    on the loop is replayed here as `on_event(*args)`, in order and as it
+    happens. Used where callbacks must run on the caller's thread, e.g.
+    Streamlit UI updates from pipeline events.
+    """
+    events = queue.SimpleQueue()
+    if _on_shared_loop():
+        return run_sync(start(on_event))
+
+    future = asyncio.run_coroutine_threadsafe(start(lambda *args: events.put(args)), shared_loop())
+    try:
+        while True:
+            try:
+                args = events.get(timeout=0.05)
+            except queue.Empty:
+                if future.done() and events.empty():
+                    break
+                continue
+            on_event(*args)
+    except BaseException:
+        future.cancel()
+        raise
+    return _wait(future)
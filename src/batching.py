@@ -0,0 +1,145 @@
+"""
+batching.py — Coalesce concurrent single-item requests into micro-batches.
+
+Callers on many threads `submit()` one item each and block on the result.
+A single worker thread takes the first waiting item, keeps collecting for
+up to `max_wait_ms` (or until `max_batch_size` items), then runs the batch
+function once over all of them. Vectorized inference amortizes per-call
+overhead across the batch, which keeps tail latency stable under load.
+"""
+
+import concurrent.futures
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+LATENCY_WINDOW = 2048   # recent request latencies kept for percentiles
+
+
+class MicroBatcher:
+    def __init__(self, batch_fn, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        """`batch_fn(items) -> results` must return one result per item, in order."""
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._requests = 0
+        self._errors = 0
+        self._timeouts = 0
+        self._batches = 0
+        self._batched_items = 0
+        self._max_seen_batch = 0
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    # -- client side ---------------------------------------------------------
+    def submit_async(self, item) -> Future:
+        """Queue `item`; the returned Future resolves when its batch has run."""
+        if self._stopped.is_set():
+            raise RuntimeError("MicroBatcher is stopped")
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def submit(self, item, timeout: float = None):
+        """Queue `item`, wait for its batch to run and return its result."""
+        return self.submit_many([item], timeout)[0]
+
+    def submit_many(self, items, timeout: float = None) -> list:
+        """
+        Queue every item separately (so they share batches with other callers)
+        and return their results in order. `timeout` covers all of them; on
+        timeout the unfinished ones are cancelled, counted and
+        concurrent.futures.TimeoutError is raised.
+        """
+        futures = [self.submit_async(item) for item in items]
+        done, pending = concurrent.futures.wait(futures, timeout=timeout)
+        if pending:
+            for future in pending:
+                future.cancel()   # skipped by the worker if it has not started yet
+            with self._stats_lock:
+                self._timeouts += len(pending)
+            raise concurrent.futures.TimeoutError()
+        return [future.result() for future in futures]
+
+    def stop(self, timeout: float = 5.0):
+        self._stopped.set()
+        self._queue.put(None)
+        self._worker.join(timeout)
+
+    # -- worker side ---------------------------------------------------------
+    def _collect(self) -> list:
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                self._stopped.set()
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            # A request may have timed out and given up while it waited
+            batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            failed = False
+            try:
+                results = self.batch_fn([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} items")
+            except Exception as exc:
+                failed = True
+                for _, fut, _ in batch:
+                    fut.set_exception(exc)
+            else:
+                for (_, fut, _), result in zip(batch, results):
+                    fut.set_result(result)
+            done = time.perf_counter()
+            with self._stats_lock:
+                self._requests += len(batch)
+                self._errors += len(batch) if failed else 0
+                self._batches += 1
+                self._batched_items += len(batch)
+                self._max_seen_batch = max(self._max_seen_batch, len(batch))
+                self._latencies.extend(done - queued_at for _, _, queued_at in batch)
+
+    # -- metrics -------------------------------------------------------------
+    def stats(self) -> dict:
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            pct = lambda q: round(1000 * latencies[min(len(latencies) - 1, int(q * len(latencies)))], 3) \
+                if latencies else None
+            return {
+                "requests": self._requests,
+                "errors": self._errors,
+                "timeouts": self._timeouts,
+                "batches": self._batches,
+                "avg_batch_size": round(self._batched_items / self._batches, 2) if self._batches else 0.0,
+                "max_batch_size_seen": self._max_seen_batch,
+                "queue_depth": self._queue.qsize(),
+                "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99)},
+                "config": {"max_batch_size": self.max_batch_size, "max_wait_ms": self.max_wait * 1000.0},
+            }
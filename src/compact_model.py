@@ -0,0 +1,400 @@
+"""
+compact_model.py — Compact, memory-mappable difficulty model artifacts.
+
+The joblib pickles in models/ need scikit-learn to load and unpickle a full
+Python vocabulary dict. This module exports the fitted vectorizer + linear
+classifier as plain arrays in a versioned directory models/compact/<version>/:
+
+    meta.json           vectorizer / classifier settings, classes, format version
+    vocab_hashes.npy    uint64 64-bit term hashes, sorted      (TF-IDF only)
+    vocab_columns.npy   int32 feature column for each hash     (TF-IDF only)
+    vocab_offsets.npy   int64 byte offsets into vocab_strings  (TF-IDF only)
+    vocab_strings.bin   the terms, UTF-8, concatenated in hash order
+    idf.npy             float64 IDF weights                    (TF-IDF only)
+    coef.npy            float64 (n_classes, n_features) coefficients
+    intercept.npy       float64 (n_classes,)
+
+`CompactDifficultyModel` memory-maps these arrays (so replicas on one host
+share the pages) and reproduces `vectorizer.transform` + `model.predict_proba`
+with NumPy only — scikit-learn is not imported at inference time.
+
+Exported files are never rewritten: a new export is written to a temporary
+directory, renamed to its version, and then models/compact/CURRENT is
+atomically replaced to point at it. Running processes keep their mapped
+(old) files and readers never see a half-written set. Older versions beyond
+KEEP_VERSIONS are removed (unlinking mapped files is safe). A flat
+models/compact/ without CURRENT, as written before versioning, still loads.
+
+Convert existing pickles with:
+    python src/compact_model.py models
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import struct
+import time
+from collections import Counter
+
+import numpy as np
+
+FORMAT_VERSION = 1
+COMPACT_DIRNAME = "compact"
+CURRENT_FILENAME = "CURRENT"
+KEEP_VERSIONS = 2
+_ARTIFACT_FILES = (
+    "meta.json", "vocab_hashes.npy", "vocab_columns.npy", "vocab_offsets.npy",
+    "vocab_strings.bin", "idf.npy", "coef.npy", "intercept.npy",
+)
+
+
+# ── Hashing ──────────────────────────────────────────────────────────────────
+def _term_hash(term: str) -> int:
+    """Stable 64-bit hash of a vocabulary term (blake2b, C-implemented)."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _murmurhash3_32(data: bytes, seed: int = 0) -> int:
+    """Signed MurmurHash3 x86_32 — identical to sklearn.utils.murmurhash3_32(positive=False)."""
+    c1, c2 = 0xCC9E2D51, 0x1B873593
+    h = seed & 0xFFFFFFFF
+    n_blocks = len(data) // 4
+    for (k,) in struct.iter_unpack("<I", data[:n_blocks * 4]):
+        k = (k * c1) & 0xFFFFFFFF
+        k = ((k << 15) | (k >> 17)) & 0xFFFFFFFF
+        k = (k * c2) & 0xFFFFFFFF
+        h ^= k
+        h = ((h << 13) | (h >> 19)) & 0xFFFFFFFF
+        h = (h * 5 + 0xE6546B64) & 0xFFFFFFFF
+    tail = data[n_blocks * 4:]
+    k = 0
+    if len(tail) >= 3:
+        k ^= tail[2] << 16
+    if len(tail) >= 2:
+        k ^= tail[1] << 8
+    if len(tail) >= 1:
+        k ^= tail[0]
+        k = (k * c1) & 0xFFFFFFFF
+        k = ((k << 15) | (k >> 17)) & 0xFFFFFFFF
+        k = (k * c2) & 0xFFFFFFFF
+        h ^= k
+    h ^= len(data)
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & 0xFFFFFFFF
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & 0xFFFFFFFF
+    h ^= h >> 16
+    return h - (1 << 32) if h & 0x80000000 else h
+
+
+# ── Export ───────────────────────────────────────────────────────────────────
+def _classifier_kind(model) -> str:
+    """How scikit-learn turns decision values into probabilities for `model`."""
+    if len(model.classes_) == 2:
+        return "binary"
+    if type(model).__name__ == "LogisticRegression":
+        multi_class = getattr(model, "multi_class", "auto")
+        if multi_class == "ovr" or (multi_class in ("auto", "deprecated") and model.solver == "liblinear"):
+            return "ovr"
+        return "multinomial"
+    return "ovr"   # SGDClassifier(loss="log_loss") and other one-vs-rest models
+
+
+def compact_model_dir(model_dir: str):
+    """Directory of the active compact export under `model_dir`, or None if there is none."""
+    root = os.path.join(model_dir, COMPACT_DIRNAME)
+    try:
+        with open(os.path.join(root, CURRENT_FILENAME), "r") as f:
+            return os.path.join(root, f.read().strip())
+    except FileNotFoundError:
+        pass
+    # flat layout written before exports were versioned
+    return root if os.path.exists(os.path.join(root, "meta.json")) else None
+
+
+def _replace_text(path: str, text: str):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _prune_versions(root: str, current: str):
+    """Remove all but the newest KEEP_VERSIONS exports, and any flat-layout files."""
+    versions = [
+        name for name in os.listdir(root)
+        if not name.startswith(".") and os.path.isdir(os.path.join(root, name))
+    ]
+    versions.sort(key=lambda name: os.path.getmtime(os.path.join(root, name)), reverse=True)
+    for name in versions[KEEP_VERSIONS:]:
+        if name != current:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    for name in _ARTIFACT_FILES:
+        path = os.path.join(root, name)
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def export_compact_model(model, vectorizer, model_dir: str) -> str:
+    """Export `model` + `vectorizer` as a new version under <model_dir>/compact and return its path."""
+    root = os.path.join(model_dir, COMPACT_DIRNAME)
+    os.makedirs(root, exist_ok=True)
+    version = time.strftime("%Y%m%d-%H%M%S-") + f"{time.time_ns() % 1_000_000_000:09d}"
+    tmp_dir = os.path.join(root, f".tmp-{version}")
+    os.makedirs(tmp_dir)
+    try:
+        _write_arrays(model, vectorizer, tmp_dir)
+        out_dir = os.path.join(root, version)
+        os.replace(tmp_dir, out_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _replace_text(os.path.join(root, CURRENT_FILENAME), version + "\n")
+    _prune_versions(root, version)
+    return out_dir
+
+
+def _write_arrays(model, vectorizer, out_dir: str):
+    is_hashing = not hasattr(vectorizer, "vocabulary_")
+    if vectorizer.analyzer != "word" or vectorizer.tokenizer is not None or vectorizer.preprocessor is not None:
+        raise ValueError("Only the default word analyzer can be exported")
+    if vectorizer.strip_accents is not None:
+        raise ValueError("strip_accents is not supported by the compact format")
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "vectorizer": "hashing" if is_hashing else "tfidf",
+        "lowercase": bool(vectorizer.lowercase),
+        "token_pattern": vectorizer.token_pattern,
+        "ngram_range": list(vectorizer.ngram_range),
+        "stop_words": sorted(vectorizer.get_stop_words() or []),
+        "binary": bool(vectorizer.binary),
+        "norm": vectorizer.norm,
+        "classes": [str(c) for c in model.classes_],
+        "classifier": _classifier_kind(model),
+        "model_type": type(model).__name__,
+    }
+
+    if is_hashing:
+        meta["n_features"] = int(vectorizer.n_features)
+        meta["alternate_sign"] = bool(vectorizer.alternate_sign)
+    else:
+        terms = list(vectorizer.vocabulary_.keys())
+        columns = np.array([vectorizer.vocabulary_[t] for t in terms], dtype=np.int32)
+        hashes = np.array([_term_hash(t) for t in terms], dtype=np.uint64)
+        order = np.argsort(hashes, kind="stable")
+        hashes, columns = hashes[order], columns[order]
+        if np.any(hashes[1:] == hashes[:-1]):
+            raise ValueError("64-bit hash collision in vocabulary; cannot export")
+        encoded = [terms[i].encode("utf-8") for i in order]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+        np.save(os.path.join(out_dir, "vocab_hashes.npy"), hashes)
+        np.save(os.path.join(out_dir, "vocab_columns.npy"), columns)
+        np.save(os.path.join(out_dir, "vocab_offsets.npy"), offsets)
+        with open(os.path.join(out_dir, "vocab_strings.bin"), "wb") as f:
+            f.write(b"".join(encoded))
+
+        meta["n_features"] = len(terms)
+        meta["sublinear_tf"] = bool(vectorizer.sublinear_tf)
+        meta["use_idf"] = bool(vectorizer.use_idf)
+        if vectorizer.use_idf:
+            np.save(os.path.join(out_dir, "idf.npy"), np.asarray(vectorizer.idf_, dtype=np.float64))
+
+    np.save(os.path.join(out_dir, "coef.npy"), np.ascontiguousarray(model.coef_, dtype=np.float64))
+    np.save(os.path.join(out_dir, "intercept.npy"), np.asarray(model.intercept_, dtype=np.float64))
+
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+# ── Inference ────────────────────────────────────────────────────────────────
+class CompactDifficultyModel:
+    """NumPy-only replacement for `vectorizer.transform` + `model.predict_proba`."""
+
+    def __init__(self, compact_dir: str, mmap: bool = True):
+        with open(os.path.join(compact_dir, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact model format: {self.meta.get('format_version')}")
+
+        mode = "r" if mmap else None
+        load = lambda name: np.load(os.path.join(compact_dir, name), mmap_mode=mode)
+
+        self.classes_ = np.array(self.meta["classes"], dtype=object)
+        self.n_features = int(self.meta["n_features"])
+        self.is_hashing = self.meta["vectorizer"] == "hashing"
+        self.coef_ = load("coef.npy")
+        self.intercept_ = load("intercept.npy")
+
+        self._token_re = re.compile(self.meta["token_pattern"])
+        self._stop_words = frozenset(self.meta.get("stop_words") or [])
+        self._min_n, self._max_n = self.meta["ngram_range"]
+
+        if not self.is_hashing:
+            self._hashes = load("vocab_hashes.npy")
+            self._columns = load("vocab_columns.npy")
+            self._offsets = load("vocab_offsets.npy")
+            self._strings = np.memmap(os.path.join(compact_dir, "vocab_strings.bin"), dtype=np.uint8, mode="r") \
+                if mmap else np.fromfile(os.path.join(compact_dir, "vocab_strings.bin"), dtype=np.uint8)
+            self._idf = load("idf.npy") if self.meta.get("use_idf") else None
+
+    # -- analysis (mirrors sklearn's word analyzer) --------------------------
+    def _analyze(self, doc: str) -> list:
+        if self.meta["lowercase"]:
+            doc = doc.lower()
+        tokens = self._token_re.findall(doc)
+        if self._stop_words:
+            tokens = [t for t in tokens if t not in self._stop_words]
+        if self._max_n == 1:
+            return tokens
+        grams = list(tokens) if self._min_n == 1 else []
+        n_tokens = len(tokens)
+        for n in range(max(self._min_n, 2), min(self._max_n, n_tokens) + 1):
+            grams.extend(" ".join(tokens[i:i + n]) for i in range(n_tokens - n + 1))
+        return grams
+
+    def _lookup(self, terms: list) -> tuple:
+        """Vocabulary columns for `terms`; returns (columns, mask of known terms)."""
+        hashes = np.fromiter((_term_hash(t) for t in terms), dtype=np.uint64, count=len(terms))
+        pos = np.searchsorted(self._hashes, hashes)
+        pos_clipped = np.minimum(pos, len(self._hashes) - 1)
+        known = (pos < len(self._hashes)) & (self._hashes[pos_clipped] == hashes)
+        # Confirm the bytes too, so an unseen term can never alias a vocabulary hash
+        for i in np.flatnonzero(known):
+            p = pos_clipped[i]
+            if self._strings[self._offsets[p]:self._offsets[p + 1]].tobytes() != terms[i].encode("utf-8"):
+                known[i] = False
+        return self._columns[pos_clipped], known
+
+    def _hashed_row(self, grams: list) -> tuple:
+        counts = {}
+        n = self.n_features
+        for g in grams:
+            h = _murmurhash3_32(g.encode("utf-8"))
+            col = (2147483647 - (n - 1)) % n if h == -2147483648 else abs(h) % n
+            sign = -1.0 if (self.meta["alternate_sign"] and h < 0) else 1.0
+            counts[col] = counts.get(col, 0.0) + sign
+        cols = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        vals = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        keep = vals != 0
+        cols, vals = cols[keep], vals[keep]
+        if self.meta["binary"]:
+            vals = np.ones_like(vals)
+        return cols, vals
+
+    def _vocab_row(self, term_counts: Counter, vocab: dict) -> tuple:
+        hits = [(vocab[t], c) for t, c in term_counts.items() if t in vocab]
+        cols = np.fromiter((col for col, _ in hits), dtype=np.int64, count=len(hits))
+        vals = np.fromiter((c for _, c in hits), dtype=np.float64, count=len(hits))
+        if self.meta["binary"]:
+            vals = np.ones_like(vals)
+        if self.meta.get("sublinear_tf"):
+            vals = np.log(vals) + 1.0
+        if self._idf is not None:
+            vals = vals * self._idf[cols]
+        return cols, vals
+
+    def _normalize_row(self, cols: np.ndarray, vals: np.ndarray) -> tuple:
+        norm = self.meta["norm"]
+        if norm == "l2":
+            total = math.sqrt(float(np.dot(vals, vals)))
+        elif norm == "l1":
+            total = float(np.abs(vals).sum())
+        else:
+            total = 0.0
+        if total > 0:
+            vals = vals / total
+        order = np.argsort(cols)
+        return cols[order], vals[order]
+
+    def _rows(self, texts) -> list:
+        """Sorted (columns, values) of each transformed document."""
+        analyzed = [self._analyze(t if isinstance(t, str) else "") for t in texts]
+        if self.is_hashing:
+            return [self._normalize_row(*self._hashed_row(grams)) for grams in analyzed]
+
+        # Look every distinct term of the batch up once, not once per document
+        term_counts = [Counter(grams) for grams in analyzed]
+        unique = list({t for counts in term_counts for t in counts})
+        vocab = {}
+        if unique:
+            columns, known = self._lookup(unique)
+            vocab = {t: int(c) for t, c, k in zip(unique, columns, known) if k}
+        return [self._normalize_row(*self._vocab_row(counts, vocab)) for counts in term_counts]
+
+    def _csr(self, texts) -> tuple:
+        rows = self._rows(texts)
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(c) for c, _ in rows])
+        indices = np.concatenate([c for c, _ in rows]) if rows else np.empty(0, dtype=np.int64)
+        data = np.concatenate([v for _, v in rows]) if rows else np.empty(0, dtype=np.float64)
+        return data, indices, indptr
+
+    def transform(self, texts):
+        """Feature matrix as scipy CSR (scipy is only needed for this method)."""
+        from scipy.sparse import csr_matrix
+
+        data, indices, indptr = self._csr(texts)
+        return csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, self.n_features))
+
+    def decision_function(self, texts) -> np.ndarray:
+        data, indices, indptr = self._csr(texts)
+        # Row-wise sparse · dense: gather coefficient columns, weight, sum per row
+        contrib = np.asarray(self.coef_)[:, indices].T * data[:, None]
+        scores = np.zeros((len(indptr) - 1, self.coef_.shape[0]), dtype=np.float64)
+        row_ids = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        np.add.at(scores, row_ids, contrib)
+        return scores + np.asarray(self.intercept_)
+
+    def _proba(self, scores: np.ndarray) -> np.ndarray:
+        kind = self.meta["classifier"]
+        if kind == "binary":
+            p = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - p, p])
+        if kind == "multinomial":
+            scores = scores - scores.max(axis=1, keepdims=True)
+            exp = np.exp(scores)
+            return exp / exp.sum(axis=1, keepdims=True)
+        prob = 1.0 / (1.0 + np.exp(-scores))
+        return prob / prob.sum(axis=1, keepdims=True)
+
+    def _labels(self, scores: np.ndarray) -> np.ndarray:
+        # Like sklearn: argmax of the decision values (probabilities can saturate and tie)
+        if self.meta["classifier"] == "binary":
+            return self.classes_[(scores[:, 0] > 0).astype(int)]
+        return self.classes_[np.argmax(scores, axis=1)]
+
+    def predict_proba(self, texts) -> np.ndarray:
+        return self._proba(self.decision_function(texts))
+
+    def predict(self, texts) -> np.ndarray:
+        return self._labels(self.decision_function(texts))
+
+    def predict_with_proba(self, texts) -> tuple:
+        """(labels, probabilities) from a single pass over `texts`."""
+        scores = self.decision_function(texts)
+        return self._labels(scores), self._proba(scores)
+
+
+def load_compact_model(model_dir: str, mmap: bool = True):
+    """CompactDifficultyModel from <model_dir>/compact, or None if it has not been exported."""
+    compact_dir = compact_model_dir(model_dir)
+    if compact_dir is None:
+        return None
+    return CompactDifficultyModel(compact_dir, mmap=mmap)
+
+
+if __name__ == "__main__":
+    import sys
+    import joblib
+
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else "models"
+    model = joblib.load(os.path.join(model_dir, "logistic_regression_model.pkl"))
+    vectorizer = joblib.load(os.path.join(model_dir, "tfidf_vectorizer.pkl"))
+    print(f"✅ Compact model written to {export_compact_model(model, vectorizer, model_dir)}/")
@@ -0,0 +1,90 @@
+"""
+difficulty.py — Score-percentile difficulty labels, computed once per upload.
+
+Questions scoring in the bottom third are labelled Hard, the middle third
+Medium and the top third Easy. The labels are stored as one compact
+categorical Series (1 byte per question) aligned with the uploaded
+DataFrame, together with the thresholds and counts, so every page reads the
+same result instead of copying the DataFrame and re-running `pd.cut`.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .quantile_sketch import sketch_of
+except ImportError:
+    from quantile_sketch import sketch_of
+
+DIFFICULTY_QUANTILES = (0.33, 0.66)
+LEVELS = ["Hard", "Medium", "Easy"]          # ascending score order
+DISPLAY_ORDER = ["Easy", "Medium", "Hard"]
+SCORE_COLUMNS = ["Score", "score", "OwnerUserId"]
+
+
+@dataclass(frozen=True)
+class DifficultyLabels:
+    score_col: str
+    labels: pd.Series        # categorical, NaN where the score is missing
+    low: float
+    high: float
+    counts: dict             # level -> number of questions
+
+    @property
+    def total(self) -> int:
+        return len(self.labels)
+
+    def mask(self, level: str) -> np.ndarray:
+        return (self.labels == level).to_numpy()
+
+    def distribution(self) -> dict:
+        """Summary consumed by the analyzer agent and the JSON export."""
+        total = self.total
+        return {
+            **{level: self.counts[level] for level in DISPLAY_ORDER},
+            "total": total,
+            "thresholds": {"low": float(self.low), "high": float(self.high)},
+            "percentages": {
+                level: round(self.counts[level] / total * 100, 1) if total else 0.0
+                for level in DISPLAY_ORDER
+            },
+        }
+
+
+def find_score_column(df: pd.DataFrame):
+    """First numeric score-like column of the questions data, or None."""
+    for col in SCORE_COLUMNS:
+        if col in df.columns:
+            return col if pd.api.types.is_numeric_dtype(df[col]) else None
+    return None
+
+
+def thresholds(scores: pd.Series = None, sketch=None) -> tuple:
+    """(low, high) cut points, from a quantile sketch when one is available."""
+    if sketch is None:
+        sketch = sketch_of(scores)
+    low, high = sketch.quantiles(DIFFICULTY_QUANTILES)
+    return low, high
+
+
+def label_scores(scores: pd.Series, low: float, high: float) -> pd.Series:
+    return pd.cut(scores, bins=[-np.inf, low, high, np.inf], labels=LEVELS)
+
+
+def compute_difficulty(df: pd.DataFrame, sketches: dict = None):
+    """Labels, thresholds and counts for `df`, or None if it has no numeric score column."""
+    score_col = find_score_column(df)
+    if score_col is None:
+        return None
+    low, high = thresholds(df[score_col], (sketches or {}).get(score_col))
+    labels = label_scores(df[score_col], low, high)
+    counts = labels.value_counts()
+    return DifficultyLabels(
+        score_col=score_col,
+        labels=labels,
+        low=low,
+        high=high,
+        counts={level: int(counts.get(level, 0)) for level in LEVELS},
+    )
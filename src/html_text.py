@@ -0,0 +1,155 @@
+"""
+html_text.py — Fast HTML-to-text extraction.
+
+A streaming extractor built on the standard library's `html.parser`, used
+instead of building a full BeautifulSoup tree for every question body. It
+mirrors `BeautifulSoup(text, "html.parser").get_text(separator)`:
+
+- text inside <code>, <pre> and every other element is kept, in order
+- <script> / <style> / <template> / <rt> / <rp> contents, comments,
+  doctypes and processing instructions are dropped; CDATA sections are kept
+- character references (&amp;, &#39;, &nbsp; ...) are decoded the way
+  BeautifulSoup decodes them: a known entity name with or without ";",
+  an unknown one kept literally as "&name", numeric references per the
+  HTML spec (Windows-1252 for 0x80-0x9F, U+FFFD for invalid code points)
+- malformed markup (unclosed tags, stray "<") never raises; an end tag
+  closes every tag opened after its match and is ignored if nothing matches
+- adjacent text runs are merged, and runs separated by markup are joined
+  with `separator`, exactly like BeautifulSoup's string joining
+- a whitespace-only run outside <pre>/<textarea> collapses to a single
+  "\n" (if it contained a newline) or " ", as BeautifulSoup does
+"""
+
+import re
+from html.entities import html5
+from html.parser import HTMLParser
+
+# text inside these is not document text (BeautifulSoup's string containers)
+_SKIP_CONTENT_TAGS = {"script", "style", "template", "rt", "rp"}
+_PRESERVE_WHITESPACE_TAGS = {"pre", "textarea"}
+# void elements never stay open, so they can't hide or preserve later text
+_VOID_TAGS = {
+    "area", "base", "basefont", "bgsound", "br", "col", "command", "embed",
+    "frame", "hr", "image", "img", "input", "isindex", "keygen", "link",
+    "menuitem", "meta", "nextid", "param", "source", "spacer", "track", "wbr",
+}
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+# entity name (without ";") -> text; the first spelling in sorted order wins
+_ENTITIES = {}
+for _name, _char in sorted(html5.items()):
+    _ENTITIES.setdefault(_name[:-1] if _name.endswith(";") else _name, _char)
+
+_DECIMAL_REFERENCE_RE = re.compile("^([0-9]+)(.*)")
+_HEX_REFERENCE_RE = re.compile("^([0-9a-f]+)(.*)")
+
+
+def _codepoint_text(code: int) -> str:
+    if code == 0 or code > 0x10FFFF or 0xD800 <= code <= 0xDFFF:
+        return "\ufffd"
+    if 0x80 <= code <= 0x9F:
+        try:
+            return bytes([code]).decode("cp1252")
+        except UnicodeDecodeError:
+            pass
+    return chr(code)
+
+
+def _numeric_reference(name: str) -> str:
+    """Text of "&#<name>;"; digits that don't parse are kept as text, as BeautifulSoup does."""
+    base, pattern = 10, _DECIMAL_REFERENCE_RE
+    if name[:1] in ("x", "X"):
+        name, base, pattern = name[1:], 16, _HEX_REFERENCE_RE
+    try:
+        return _codepoint_text(int(name, base))
+    except ValueError:
+        match = pattern.search(name)
+        if match is None:
+            return name
+        return _codepoint_text(int(match.group(1), base)) + match.group(2)
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.parts = []
+        self._pending = []
+        self._open = []          # open tag names, innermost last
+        self._skip_depth = 0     # open _SKIP_CONTENT_TAGS
+        self._preserve_depth = 0  # open _PRESERVE_WHITESPACE_TAGS
+
+    def _flush(self, keep: bool = False):
+        """End the current text run; it is kept unless inside a skipped tag (or `keep`)."""
+        if self._pending:
+            data = "".join(self._pending)
+            self._pending = []
+            if not self._preserve_depth and not data.strip(_ASCII_SPACES):
+                data = "\n" if "\n" in data else " "
+            if keep or not self._skip_depth:
+                self.parts.append(data)
+
+    def _push(self, tag):
+        self._open.append(tag)
+        self._skip_depth += tag in _SKIP_CONTENT_TAGS
+        self._preserve_depth += tag in _PRESERVE_WHITESPACE_TAGS
+
+    def _pop(self):
+        tag = self._open.pop()
+        self._skip_depth -= tag in _SKIP_CONTENT_TAGS
+        self._preserve_depth -= tag in _PRESERVE_WHITESPACE_TAGS
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag not in _VOID_TAGS:
+            self._push(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+
+    def handle_endtag(self, tag):
+        # like BeautifulSoup: close everything up to the matching open tag,
+        # and ignore an end tag that matches nothing
+        self._flush()
+        if tag in self._open:
+            while self._open[-1] != tag:
+                self._pop()
+            self._pop()
+
+    def handle_data(self, data):
+        self._pending.append(data)
+
+    def handle_entityref(self, name):
+        self.handle_data(_ENTITIES.get(name, "&" + name))
+
+    def handle_charref(self, name):
+        self.handle_data(_numeric_reference(name))
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.upper().startswith("CDATA["):
+            self._pending.append(data[len("CDATA["):])
+            self._flush(keep=True)
+
+
+def html_to_text(text: str, separator: str = "") -> str:
+    """Strip markup from `text` and return its text content."""
+    if not text:
+        return ""
+    parser = _TextExtractor()
+    try:
+        parser.feed(text)
+        parser.close()
+    except Exception:
+        # html.parser is very lenient; anything it still rejects is kept as plain text
+        return text
+    parser._flush()
+    return separator.join(parser.parts)
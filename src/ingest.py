@@ -0,0 +1,263 @@
+"""
+ingest.py — Streaming ingestion of uploaded questions / responses CSVs.
+
+Uploads are read in chunks with only the columns the app uses, so files
+with millions of rows load without a row cap and without materializing
+columns nobody reads (e.g. the answer bodies of a response log). Numeric
+columns are parsed without a forced dtype and coerced chunk by chunk, so
+a stray non-numeric cell becomes NaN instead of failing the upload. Summary
+statistics are accumulated chunk by chunk:
+
+- `RunningStats` keeps count / mean / variance (Welford, mergeable) and
+  min / max per numeric column
+- a `KLLSketch` per numeric column answers quantiles (quartiles, the
+  33/66% difficulty cut points) without keeping or sorting the column
+- per-question response aggregates (count, mean, std of Score by
+  ParentId) are merged across chunks with the same parallel formula
+
+- a fixed-range `Histogram` per requested column, for distribution plots
+  of columns whose rows are not kept
+
+`describe_frame()` turns the accumulated stats into the same layout as
+`DataFrame.describe()`.
+
+Rows are only kept where the app needs them per row: every question (its
+difficulty label, live evaluation and text), but no response — a response
+log is summarized by the stats above plus a capped preview, so its memory
+use does not grow with the file. Columns outside the whitelist are never
+loaded; their names are reported in `IngestResult.dropped_columns`.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .quantile_sketch import KLLSketch
+except ImportError:
+    from quantile_sketch import KLLSketch
+
+CHUNK_SIZE = 200_000
+GROUP_COMPACT_EVERY = 16   # merge per-question partials after this many chunks
+PREVIEW_ROWS = 10          # rows shown on the upload page
+
+# Columns kept from each upload and the dtype they end up as
+NUMERIC_DTYPES = ("float64", "Int64")
+
+QUESTION_COLUMNS = {
+    "Id": "Int64",
+    "OwnerUserId": "Int64",
+    "CreationDate": "str",
+    "creation_date": "str",
+    "ClosedDate": "str",
+    "Score": "float64",
+    "score": "float64",
+    "Title": "str",
+    "Body": "str",
+    "Tags": "str",
+}
+RESPONSE_COLUMNS = {
+    "Id": "Int64",
+    "OwnerUserId": "Int64",
+    "CreationDate": "str",
+    "ParentId": "Int64",
+    "Score": "float64",
+}
+RESPONSE_HISTOGRAMS = {"Score": (-10, 50, 30)}   # column -> (low, high, bins), as plotted
+
+
+class RunningStats:
+    """Streaming count / mean / std / min / max of one numeric column."""
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        arr = np.asarray(values, dtype=np.float64)
+        arr = arr[~np.isnan(arr)]
+        if arr.size:
+            mean = float(arr.mean())
+            self._combine(arr.size, mean, float(((arr - mean) ** 2).sum()),
+                          float(arr.min()), float(arr.max()))
+
+    def merge(self, other: "RunningStats"):
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+    def _combine(self, n, mean, m2, lo, hi):
+        # Chan et al. parallel update of (count, mean, M2)
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, lo)
+        self.max = max(self.max, hi)
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else np.nan
+
+
+class Histogram:
+    """Streaming fixed-range histogram; values outside [low, high] count in the edge bins."""
+
+    def __init__(self, low: float, high: float, bins: int):
+        self.edges = np.linspace(low, high, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    def update(self, values):
+        arr = np.asarray(values, dtype=np.float64)
+        arr = arr[~np.isnan(arr)]
+        if arr.size:
+            clipped = np.clip(arr, self.edges[0], self.edges[-1])
+            self.counts += np.histogram(clipped, bins=self.edges)[0]
+
+
+@dataclass
+class IngestResult:
+    df: pd.DataFrame                 # the kept columns of every row, None unless keep_rows
+    preview: pd.DataFrame            # the first PREVIEW_ROWS rows
+    rows: int
+    chunks: int
+    stats: dict                      # column -> RunningStats
+    sketches: dict                   # column -> KLLSketch
+    per_question: pd.DataFrame = None
+    histograms: dict = None          # column -> Histogram
+    dropped_columns: list = None     # uploaded columns that were not loaded
+
+
+def describe_frame(stats: dict, sketches: dict) -> pd.DataFrame:
+    """`df.describe()` layout built from the streamed stats and quantile sketches."""
+    summary = {}
+    for col, s in stats.items():
+        q25, q50, q75 = sketches[col].quantiles([0.25, 0.5, 0.75])
+        summary[col] = {
+            "count": float(s.count),
+            "mean": s.mean if s.count else np.nan,
+            "std": s.std,
+            "min": s.min if s.count else np.nan,
+            "25%": q25,
+            "50%": q50,
+            "75%": q75,
+            "max": s.max if s.count else np.nan,
+        }
+    return pd.DataFrame(summary)
+
+
+def _group_partial(chunk: pd.DataFrame, key: str, value: str) -> pd.DataFrame:
+    grouped = chunk[[key, value]].dropna().groupby(key)[value]
+    partial = grouped.agg(["count", "mean"])
+    partial["m2"] = grouped.var(ddof=0) * partial["count"]
+    return partial
+
+
+def _merge_group_partials(parts: list) -> pd.DataFrame:
+    df = pd.concat(parts)
+    if df.empty:
+        return df
+    level = df.index.name
+    count = df["count"].groupby(level=0).sum()
+    mean = (df["mean"] * df["count"]).groupby(level=0).sum() / count
+    spread = df["m2"] + df["count"] * (df["mean"] - mean.reindex(df.index).to_numpy()) ** 2
+    merged = pd.DataFrame({"count": count, "mean": mean, "m2": spread.groupby(level=0).sum()})
+    merged.index.name = level
+    return merged
+
+
+def per_question_stats(partial: pd.DataFrame) -> pd.DataFrame:
+    """Count / mean / std (ddof=1) of response Score per question, as groupby().agg() gives."""
+    out = pd.DataFrame({
+        "mean": partial["mean"],
+        "count": partial["count"].astype("int64"),
+        "std": np.sqrt(partial["m2"] / (partial["count"] - 1)).where(partial["count"] > 1),
+    })
+    return out.reset_index()
+
+
+def _coerce(values: pd.Series, dtype: str) -> pd.Series:
+    """Numeric column from text; unparseable cells (and non-integral ids) become NaN / <NA>."""
+    if pd.api.types.is_integer_dtype(values):
+        return values.astype(dtype)
+    numbers = pd.to_numeric(values, errors="coerce").astype("float64")
+    if dtype == "Int64":
+        numbers = numbers.where(numbers == np.floor(numbers))
+    return numbers.astype(dtype)
+
+
+def ingest_csv(source, columns: dict, chunksize: int = CHUNK_SIZE, group_by: str = None,
+               keep_rows: bool = True, histograms: dict = None) -> IngestResult:
+    """
+    Read `source` (path or file-like) chunk by chunk, keeping only `columns`.
+
+    With `group_by`, per-group Score statistics are accumulated as well;
+    `histograms` maps columns to (low, high, bins) histograms to accumulate.
+    Without `keep_rows` no chunk outlives its iteration (only the preview is
+    kept), so memory is bounded by the chunk size and the aggregates.
+    """
+    header = {}   # every uploaded column name, in file order
+
+    def wanted(col) -> bool:
+        header[col] = None
+        return col in columns
+
+    reader = pd.read_csv(
+        source,
+        encoding="latin1",
+        usecols=wanted,
+        dtype={col: dtype for col, dtype in columns.items() if dtype not in NUMERIC_DTYPES},
+        chunksize=chunksize,
+        on_bad_lines="skip",
+    )
+    frames, stats, sketches, partials = [], {}, {}, []
+    hists = {col: Histogram(*spec) for col, spec in (histograms or {}).items()}
+    preview = None
+    n_rows = n_chunks = 0
+    with reader:
+        for chunk in reader:
+            n_chunks += 1
+            n_rows += len(chunk)
+            for col in chunk.columns:
+                if columns[col] in NUMERIC_DTYPES:
+                    chunk[col] = _coerce(chunk[col], columns[col])
+                    values = chunk[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                    stats.setdefault(col, RunningStats()).update(values)
+                    sketches.setdefault(col, KLLSketch()).update(values)
+                    if col in hists:
+                        hists[col].update(values)
+            if group_by and group_by in chunk.columns and "Score" in chunk.columns:
+                partials.append(_group_partial(chunk, group_by, "Score"))
+                if len(partials) >= GROUP_COMPACT_EVERY:
+                    partials = [_merge_group_partials(partials)]
+            if preview is None or len(preview) < PREVIEW_ROWS:
+                head = chunk.head(PREVIEW_ROWS)
+                preview = head if preview is None else pd.concat([preview, head]).head(PREVIEW_ROWS)
+            if keep_rows:
+                frames.append(chunk)
+
+    empty = pd.DataFrame(columns=[])
+    df = (pd.concat(frames, ignore_index=True) if frames else empty) if keep_rows else None
+    per_question = per_question_stats(_merge_group_partials(partials)) if partials else None
+    return IngestResult(df=df, preview=(empty if preview is None else preview.reset_index(drop=True)),
+                        rows=n_rows, chunks=n_chunks, stats=stats, sketches=sketches,
+                        per_question=per_question,
+                        histograms={col: h for col, h in hists.items() if col in stats},
+                        dropped_columns=[col for col in header if col not in columns])
+
+
+def read_questions(source, chunksize: int = CHUNK_SIZE) -> IngestResult:
+    # Every question is needed: labels, live evaluation and topic extremes are per row
+    return ingest_csv(source, QUESTION_COLUMNS, chunksize)
+
+
+def read_responses(source, chunksize: int = CHUNK_SIZE) -> IngestResult:
+    # Only aggregates of the responses are shown, so their rows are not kept
+    return ingest_csv(source, RESPONSE_COLUMNS, chunksize, group_by="ParentId",
+                      keep_rows=False, histograms=RESPONSE_HISTOGRAMS)
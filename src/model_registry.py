@@ -0,0 +1,139 @@
+"""
+model_registry.py — Process-wide cache of the trained difficulty model.
+
+`get_model(model_dir)` loads the artifacts in models/ once per process and
+hands the same `DifficultyModel` to every caller (all Streamlit sessions,
+the batch scorer, the HTTP service). On each call the artifact files are
+stat-ed; if any size/mtime changed (e.g. after `python generate_models.py`)
+the model is reloaded, otherwise the cached instance is returned.
+
+The compact array format (models/compact/) is preferred because it loads
+in milliseconds without scikit-learn; the joblib pickles are the fallback.
+"""
+
+import hashlib
+import os
+import threading
+
+try:
+    from .compact_model import COMPACT_DIRNAME, CURRENT_FILENAME, compact_model_dir, load_compact_model
+    from .normalization import load_config, normalize_text
+except ImportError:
+    from compact_model import COMPACT_DIRNAME, CURRENT_FILENAME, compact_model_dir, load_compact_model
+    from normalization import load_config, normalize_text
+
+MODEL_DIR = "models"
+MODEL_FILENAME = "logistic_regression_model.pkl"
+VECTORIZER_FILENAME = "tfidf_vectorizer.pkl"
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class DifficultyModel:
+    """A loaded classifier together with the text normalization it was trained with."""
+
+    def __init__(self, model_dir: str, version: str):
+        self.model_dir = model_dir
+        self.version = version
+        self.normalization = load_config(model_dir)
+
+        self._compact = load_compact_model(model_dir)
+        if self._compact is not None:
+            self._vectorizer = self._model = None
+            self.classes_ = self._compact.classes_
+            self.is_hashing = self._compact.is_hashing
+            self.n_features = self._compact.n_features
+            model_type = self._compact.meta.get("model_type", "LogisticRegression")
+        else:
+            import joblib
+
+            self._model = joblib.load(os.path.join(model_dir, MODEL_FILENAME))
+            self._vectorizer = joblib.load(os.path.join(model_dir, VECTORIZER_FILENAME))
+            self.classes_ = self._model.classes_
+            self.is_hashing = not hasattr(self._vectorizer, "vocabulary_")
+            self.n_features = (self._vectorizer.n_features if self.is_hashing
+                               else len(self._vectorizer.vocabulary_))
+            model_type = type(self._model).__name__
+
+        # Either the TF-IDF + LogisticRegression model or the out-of-core
+        # hashing + SGD model (generate_models.py --trainer sgd)
+        self.algorithm = "SGD Logistic (hashed)" if model_type == "SGDClassifier" else "Logistic Regression"
+
+    @property
+    def backend(self) -> str:
+        return "compact" if self._compact is not None else "joblib"
+
+    def clean(self, texts, cache: bool = True) -> list:
+        return [normalize_text(t, self.normalization, cache=cache) for t in texts]
+
+    def transform(self, cleaned_texts):
+        if self._compact is not None:
+            return self._compact.transform(cleaned_texts)
+        return self._vectorizer.transform(cleaned_texts)
+
+    def predict_proba(self, cleaned_texts):
+        if self._compact is not None:
+            return self._compact.predict_proba(cleaned_texts)
+        return self._model.predict_proba(self._vectorizer.transform(cleaned_texts))
+
+    def predict(self, cleaned_texts):
+        if self._compact is not None:
+            return self._compact.predict(cleaned_texts)
+        return self._model.predict(self._vectorizer.transform(cleaned_texts))
+
+    def predict_with_proba(self, cleaned_texts) -> tuple:
+        """(labels, probabilities), vectorizing `cleaned_texts` only once."""
+        if self._compact is not None:
+            return self._compact.predict_with_proba(cleaned_texts)
+        X = self._vectorizer.transform(cleaned_texts)
+        return self._model.predict(X), self._model.predict_proba(X)
+
+
+def _artifact_paths(model_dir: str) -> list:
+    compact_dir = os.path.join(model_dir, COMPACT_DIRNAME)
+    return [
+        os.path.join(model_dir, MODEL_FILENAME),
+        os.path.join(model_dir, VECTORIZER_FILENAME),
+        os.path.join(model_dir, "normalization.json"),
+        os.path.join(compact_dir, CURRENT_FILENAME),   # changes on every export
+        os.path.join(compact_dir, "meta.json"),         # flat layout (pre-versioning)
+        os.path.join(compact_dir, "coef.npy"),
+    ]
+
+
+def _fingerprint(model_dir: str) -> tuple:
+    stamps = []
+    for path in _artifact_paths(model_dir):
+        try:
+            st = os.stat(path)
+            stamps.append((path, st.st_size, st.st_mtime_ns))
+        except FileNotFoundError:
+            stamps.append((path, None, None))
+    return tuple(stamps)
+
+
+def model_available(model_dir: str = MODEL_DIR) -> bool:
+    return (
+        compact_model_dir(model_dir) is not None
+        or (os.path.exists(os.path.join(model_dir, MODEL_FILENAME))
+            and os.path.exists(os.path.join(model_dir, VECTORIZER_FILENAME)))
+    )
+
+
+def get_model(model_dir: str = MODEL_DIR) -> DifficultyModel:
+    """Return the cached model for `model_dir`, reloading it if its files changed."""
+    key = os.path.abspath(model_dir)
+    fingerprint = _fingerprint(model_dir)
+    cached = _registry.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    with _registry_lock:
+        cached = _registry.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        version = hashlib.sha1(repr(fingerprint).encode("utf-8")).hexdigest()[:12]
+        model = DifficultyModel(model_dir, version)
+        _registry[key] = (fingerprint, model)
+        return model
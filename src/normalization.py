@@ -0,0 +1,135 @@
+"""
+normalization.py — Text normalization shared by training and serving.
+
+`generate_models.py` and `app.py` both clean question text through
+`normalize_text`, so the TF-IDF vectorizer sees identical text at train and
+serve time. The configuration used for training is written next to the
+vectorizer (models/normalization.json) and loaded back by the app.
+
+Bump NormalizationConfig.version whenever the cleaning steps themselves
+change, so a saved model can be matched to the pipeline that produced it.
+Models trained by the original script (no normalization.json, or the one
+shipped in models/) are served with LEGACY_CONFIG, which reproduces its
+regex tag stripping.
+"""
+
+import html
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, fields
+from functools import lru_cache
+
+try:
+    from .html_text import html_to_text
+except ImportError:
+    from html_text import html_to_text
+
+CONFIG_FILENAME = "normalization.json"
+CACHE_SIZE = 20000
+
+_LETTERS_RE = re.compile(r"[^a-z\s]")
+_LETTERS_DIGITS_RE = re.compile(r"[^a-z0-9\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+_TAG_RE = re.compile(r"<[^>]+>")
+
+HTML_MODES = ("parser", "regex")
+
+
+@dataclass(frozen=True)
+class NormalizationConfig:
+    version: int = 2
+    strip_html: bool = True         # unescape entities, then replace markup with spaces
+    html_mode: str = "parser"       # "parser" (html_text) or "regex" (original "<[^>]+>" strip)
+    lowercase: bool = True
+    keep_digits: bool = False       # False → letters only
+    remove_stopwords: bool = False  # NLTK English stopwords
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NormalizationConfig":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+    def __post_init__(self):
+        if self.html_mode not in HTML_MODES:
+            raise ValueError(f"Unknown html_mode: {self.html_mode!r} (expected one of {HTML_MODES})")
+
+
+# Pipeline generate_models.py trains new models with
+DEFAULT_CONFIG = NormalizationConfig()
+
+# Pipeline of the original training script, which the shipped models/ artifacts were trained with
+LEGACY_CONFIG = NormalizationConfig(html_mode="regex")
+
+
+def save_config(config: NormalizationConfig, model_dir: str) -> str:
+    path = os.path.join(model_dir, CONFIG_FILENAME)
+    with open(path, "w") as f:
+        json.dump(config.to_dict(), f, indent=2)
+    return path
+
+
+def load_config(model_dir: str) -> NormalizationConfig:
+    """Config saved next to the vectorizer, or LEGACY_CONFIG for models trained without one."""
+    path = os.path.join(model_dir, CONFIG_FILENAME)
+    if not os.path.exists(path):
+        return LEGACY_CONFIG
+    with open(path, "r") as f:
+        return NormalizationConfig.from_dict(json.load(f))
+
+
+@lru_cache(maxsize=1)
+def _stopwords() -> frozenset:
+    import nltk
+    from nltk.corpus import stopwords
+
+    nltk.download("stopwords", quiet=True)
+    return frozenset(stopwords.words("english"))
+
+
+def _normalize(text: str, config: NormalizationConfig) -> str:
+    if config.strip_html:
+        text = html.unescape(text)
+        if config.html_mode == "regex":
+            text = _TAG_RE.sub(" ", text)
+        else:
+            text = html_to_text(text, separator=" ")
+    if config.lowercase:
+        text = text.lower()
+    text = (_LETTERS_DIGITS_RE if config.keep_digits else _LETTERS_RE).sub(" ", text)
+    if config.remove_stopwords:
+        stop = _stopwords()
+        return " ".join(w for w in text.split() if w not in stop)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _normalize_cached(text: str, config: NormalizationConfig) -> str:
+    return _normalize(text, config)
+
+
+def normalize_text(text, config: NormalizationConfig = DEFAULT_CONFIG, cache: bool = True) -> str:
+    """
+    Clean one question/answer text for the classifier.
+
+    Results are memoized (LRU, keyed by the text content and config), so a
+    question that is seen again is never re-cleaned. Bulk one-off passes
+    such as training should use cache=False to avoid churning the cache.
+    """
+    if not isinstance(text, str) or not text:
+        return ""
+    if cache:
+        return _normalize_cached(text, config)
+    return _normalize(text, config)
+
+
+def normalize_many(texts, config: NormalizationConfig = DEFAULT_CONFIG, cache: bool = True) -> list:
+    return [normalize_text(t, config, cache=cache) for t in texts]
+
+
+def cache_info():
+    return _normalize_cached.cache_info()
@@ -0,0 +1,125 @@
+"""
+quantile_sketch.py — Mergeable streaming quantiles (KLL sketch).
+
+A `KLLSketch` summarizes a stream of numbers in O(k log(n/k)) memory and
+answers rank/quantile queries with a rank error of roughly 1.7 / k (~0.2%
+for the default k=1000). Sketches built over separate chunks, files or
+terms can be merged into one that is as accurate as a single pass over all
+of the data, and serialized with `to_dict()` / `from_dict()`.
+
+Reference: Karnin, Lang & Liberty, "Optimal Quantile Approximation in
+Streams" (FOCS 2016).
+"""
+
+import math
+
+import numpy as np
+
+DEFAULT_K = 1000
+_C = 2.0 / 3.0   # capacity decay per level below the top
+
+
+class KLLSketch:
+    def __init__(self, k: int = DEFAULT_K, seed: int = 0):
+        if k < 8:
+            raise ValueError("k must be >= 8")
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0, dtype=np.float64)]   # level h items weigh 2**h
+        self._rng = np.random.default_rng(seed)
+
+    # -- building ------------------------------------------------------------
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(int(math.ceil(self.k * _C ** depth)), 2)
+
+    def _compress(self):
+        while True:
+            for h, items in enumerate(self.levels):
+                if len(items) > self._capacity(h):
+                    break
+            else:
+                return
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0, dtype=np.float64))
+            items = np.sort(self.levels[h])
+            keep = items[-1:] if len(items) % 2 else items[:0]
+            pairs = items[:len(items) - len(keep)]
+            # Every other item survives with double weight; a random offset keeps it unbiased
+            promoted = pairs[int(self._rng.integers(2))::2]
+            self.levels[h] = keep
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+
+    def update(self, values) -> "KLLSketch":
+        """Add a batch of values (NaNs are ignored)."""
+        arr = np.asarray(values, dtype=np.float64).ravel()
+        arr = arr[~np.isnan(arr)]
+        if arr.size:
+            self.n += int(arr.size)
+            self.levels[0] = np.concatenate([self.levels[0], arr])
+            self._compress()
+        return self
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Fold `other` into this sketch (in place) and return it."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    # -- queries -------------------------------------------------------------
+    def _weighted(self) -> tuple:
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lv), 2 ** h, dtype=np.float64)
+                                  for h, lv in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    @property
+    def is_exact(self) -> bool:
+        """True while nothing has been compacted (every value is still stored)."""
+        return len(self.levels) == 1
+
+    def quantiles(self, qs) -> list:
+        """Approximate quantiles for each q in `qs` (NaN for an empty sketch)."""
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        if self.n == 0:
+            return [float("nan")] * len(qs)
+        if self.is_exact:
+            # Small inputs: identical to pandas/numpy linear interpolation
+            return [float(v) for v in np.quantile(self.levels[0], qs)]
+        items, cum = self._weighted()
+        idx = np.searchsorted(cum, qs * cum[-1], side="left")
+        return [float(items[min(i, len(items) - 1)]) for i in idx]
+
+    def quantile(self, q: float) -> float:
+        return self.quantiles([q])[0]
+
+    def rank(self, value: float) -> float:
+        """Approximate fraction of values <= `value`."""
+        if self.n == 0:
+            return float("nan")
+        items, cum = self._weighted()
+        i = np.searchsorted(items, value, side="right")
+        return float(cum[i - 1] / cum[-1]) if i else 0.0
+
+    # -- persistence ---------------------------------------------------------
+    def to_dict(self) -> dict:
+        return {"k": self.k, "n": self.n, "levels": [lv.tolist() for lv in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data: dict, seed: int = 0) -> "KLLSketch":
+        sketch = cls(k=data["k"], seed=seed)
+        sketch.n = int(data["n"])
+        sketch.levels = [np.asarray(lv, dtype=np.float64) for lv in data["levels"]] or [np.empty(0)]
+        return sketch
+
+    def __len__(self) -> int:
+        return self.n
+
+
+def sketch_of(values, k: int = DEFAULT_K) -> KLLSketch:
+    return KLLSketch(k).update(values)
@@ -1,2 +1,3 @@
 # rag package — Retrieval-Augmented Generation
-from .retriever import retrieve_relevant_principles
+from .retriever import retrieve_relevant_principles, retrieve_relevant_principles_batch
+from .embedder import get_model, warm_up
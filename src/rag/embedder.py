@@ -0,0 +1,52 @@
+"""
+embedder.py — Lazy, process-wide SentenceTransformer provider.
+
+The embedding model (~80MB) is only loaded the first time something needs
+it, then shared by every caller in the process. Importing the retriever is
+therefore free; the Streamlit app or CLI can call `warm_up()` explicitly when
+it wants to pay the load cost up front.
+
+Configuration (environment):
+    RAG_MODEL_PATH   Local directory with the model weights (offline use).
+                     Defaults to the hub model name "all-MiniLM-L6-v2".
+    RAG_MODEL_DEVICE Optional device passed to SentenceTransformer ("cpu", "cuda").
+"""
+
+import os
+import threading
+
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def model_name() -> str:
+    """Name or local path of the configured embedding model."""
+    return os.getenv("RAG_MODEL_PATH") or DEFAULT_MODEL_NAME
+
+
+def get_model():
+    """Return the shared SentenceTransformer, loading it on first use (thread-safe)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                # Imported here so that importing the retriever does not pull in torch
+                from sentence_transformers import SentenceTransformer
+
+                kwargs = {}
+                device = os.getenv("RAG_MODEL_DEVICE")
+                if device:
+                    kwargs["device"] = device
+                _model = SentenceTransformer(model_name(), **kwargs)
+    return _model
+
+
+def warm_up() -> None:
+    """Load the model and run one tiny encode so the first real query is fast."""
+    get_model().encode(["warm-up"], normalize_embeddings=True)
+
+
+def is_loaded() -> bool:
+    return _model is not None
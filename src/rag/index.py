@@ -0,0 +1,133 @@
+"""
+index.py — Persisted embedding index for the RAG knowledge base.
+
+The knowledge base is encoded once into a matrix of L2-normalized document
+vectors and written next to the source file:
+
+    knowledge_base.txt          → source (one principle per line)
+    knowledge_base.index.npy    → float32 matrix, shape (n_docs, dim)
+    knowledge_base.index.json   → metadata (sha256 of the source, model name, shape)
+
+The matrix is memory-mapped on load and kept in a process-wide cache. It is
+rebuilt automatically only when the knowledge base content (or the embedding
+model) changes, so a retrieval only has to encode the query.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+
+_INDEX_CACHE = {}
+_INDEX_LOCK = threading.Lock()
+
+
+class EmbeddingIndex:
+    """Documents of a knowledge base together with their normalized embeddings."""
+
+    def __init__(self, docs: list, embeddings: np.ndarray, source_hash: str, model_name: str):
+        self.docs = docs
+        self.embeddings = embeddings
+        self.source_hash = source_hash
+        self.model_name = model_name
+        self.backends = {}  # search backends built over `embeddings`, keyed by name
+        self.backends_lock = threading.Lock()  # the index is shared across threads
+
+    def __len__(self):
+        return len(self.docs)
+
+
+def _index_paths(kb_path: str) -> tuple:
+    base, _ = os.path.splitext(kb_path)
+    return base + ".index.npy", base + ".index.json"
+
+
+def _read_docs(kb_path: str) -> tuple:
+    """Return (docs, sha256 of the raw file) — non-empty stripped lines, as before."""
+    with open(kb_path, "rb") as f:
+        raw = f.read()
+    docs = [line.strip() for line in raw.decode("utf-8").splitlines() if line.strip()]
+    return docs, hashlib.sha256(raw).hexdigest()
+
+
+def _load_persisted(kb_path: str, source_hash: str, model_name: str, n_docs: int):
+    """Memory-map the stored matrix if it was built from the same source and model."""
+    npy_path, meta_path = _index_paths(kb_path)
+    if not (os.path.exists(npy_path) and os.path.exists(meta_path)):
+        return None
+    try:
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        if meta.get("source_sha256") != source_hash or meta.get("model") != model_name:
+            return None
+        embeddings = np.load(npy_path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if embeddings.ndim != 2 or embeddings.shape[0] != n_docs:
+        return None
+    return embeddings
+
+
+def _persist(kb_path: str, embeddings: np.ndarray, source_hash: str, model_name: str) -> None:
+    """Write matrix + metadata atomically so concurrent readers never see half a file."""
+    npy_path, meta_path = _index_paths(kb_path)
+    tmp_npy = npy_path + ".tmp"
+    tmp_meta = meta_path + ".tmp"
+    try:
+        with open(tmp_npy, "wb") as f:
+            np.save(f, embeddings)
+        with open(tmp_meta, "w") as f:
+            json.dump({
+                "source_sha256": source_hash,
+                "model": model_name,
+                "count": int(embeddings.shape[0]),
+                "dim": int(embeddings.shape[1]),
+            }, f, indent=2)
+        os.replace(tmp_npy, npy_path)
+        os.replace(tmp_meta, meta_path)
+    except OSError as e:
+        # Read-only deployments still work, they just keep the index in memory
+        print(f"   ⚠ Could not persist embedding index ({type(e).__name__}): {e}")
+
+
+def build_index(kb_path: str, model, model_name: str) -> EmbeddingIndex:
+    """Encode every document of `kb_path` and persist the normalized matrix."""
+    docs, source_hash = _read_docs(kb_path)
+    embeddings = model.encode(docs, normalize_embeddings=True, convert_to_numpy=True)
+    embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(docs), -1)
+    _persist(kb_path, embeddings, source_hash, model_name)
+    return EmbeddingIndex(docs, embeddings, source_hash, model_name)
+
+
+def get_index(kb_path: str, model, model_name: str) -> EmbeddingIndex:
+    """
+    Return the embedding index for `kb_path`, loading or rebuilding it as needed.
+
+    The file is only re-hashed when its size or mtime changes, and only
+    re-encoded when its content hash differs from the stored index.
+    """
+    key = (os.path.abspath(kb_path), model_name)
+    st = os.stat(kb_path)
+    stamp = (st.st_size, st.st_mtime_ns)
+
+    with _INDEX_LOCK:
+        cached = _INDEX_CACHE.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        docs, source_hash = _read_docs(kb_path)
+        if cached is not None and cached[1].source_hash == source_hash:
+            index = cached[1]
+        else:
+            embeddings = _load_persisted(kb_path, source_hash, model_name, len(docs))
+            if embeddings is not None:
+                index = EmbeddingIndex(docs, embeddings, source_hash, model_name)
+            else:
+                print(f"   Building embedding index for {len(docs)} documents ...")
+                index = build_index(kb_path, model, model_name)
+
+        _INDEX_CACHE[key] = (stamp, index)
+        return index
@@ -1,32 +1,96 @@
-from sentence_transformers import SentenceTransformer
-import numpy as np
+from .embedder import get_model, model_name
+from .index import get_index
+from .search import get_backend
 
-# Load once — small model, ~80MB, free, runs locally
-model = SentenceTransformer("all-MiniLM-L6-v2")
+KNOWLEDGE_BASE_PATH = "src/rag/knowledge_base.txt"
 
-def load_knowledge_base(path="src/rag/knowledge_base.txt"):
-    with open(path, "r") as f:
-        lines = [line.strip() for line in f.readlines() if line.strip()]
-    return lines
+# Standard damping constant for reciprocal rank fusion
+RRF_K = 60
 
-def retrieve_relevant_principles(problems: list[str], top_k: int = 3) -> list[str]:
+
+def load_knowledge_base(path=KNOWLEDGE_BASE_PATH):
+    return get_index(path, get_model(), model_name()).docs
+
+
+def _search(queries: list[str], top_k: int, backend: str = None) -> tuple:
+    """Encode all queries in one batch and return (index, per-query doc index lists)."""
+    # Model is loaded lazily on first retrieval and shared process-wide
+    model = get_model()
+
+    # Document vectors come from the persisted index — only the queries are encoded
+    index = get_index(KNOWLEDGE_BASE_PATH, model, model_name())
+
+    query_embeddings = model.encode(queries, normalize_embeddings=True)
+
+    # Cosine similarity search over normalized vectors
+    top_indices, _ = get_backend(index, backend).search(query_embeddings, top_k)
+
+    return index, [[int(i) for i in row if i >= 0] for row in top_indices]
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int = RRF_K) -> list[int]:
+    """
+    Fuse several ranked lists of document ids into one, de-duplicated.
+    Each occurrence contributes 1 / (k + rank); ties keep first-seen order.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused, key=fused.get, reverse=True)
+
+
+def retrieve_relevant_principles(problems: list[str], top_k: int = 3, backend: str = None,
+                                 multi_query: bool = False) -> list[str]:
     """
     Given a list of problems (strings), find the top_k most
     relevant principles from the knowledge base.
+
+    `backend` selects the vector search ("exact" or "ivf"); defaults to
+    the RAG_SEARCH_BACKEND environment variable, else "exact".
+
+    With `multi_query=True` every problem is its own query: all problems are
+    encoded in a single batch, top_k principles are retrieved per problem and
+    the rankings are merged with reciprocal rank fusion.
+    """
+    if not multi_query or len(problems) <= 1:
+        # Combine problems into one query
+        index, rankings = _search([" ".join(problems)], top_k, backend)
+        return [index.docs[i] for i in rankings[0]]
+
+    index, rankings = _search(list(problems), top_k, backend)
+    fused = reciprocal_rank_fusion(rankings)
+    return [index.docs[i] for i in fused[:top_k]]
+
+
+def _exam_queries(problems: list[str], multi_query: bool) -> list[str]:
+    return list(problems) if multi_query and len(problems) > 1 else [" ".join(problems)]
+
+
+def retrieve_relevant_principles_batch(problem_lists: list[list[str]], top_k: int = 3, backend: str = None,
+                                       multi_query: bool = False) -> list[list[str]]:
+    """
+    `retrieve_relevant_principles` for many exams at once.
+
+    The queries of every exam are de-duplicated (the analyzer emits a small
+    set of canned problem strings) and encoded in a single batch; each exam
+    then gets the same result it would get from its own call.
     """
-    docs = load_knowledge_base()
-    
-    # Combine problems into one query
-    query = " ".join(problems)
-    
-    # Encode everything into vectors
-    doc_embeddings = model.encode(docs)
-    query_embedding = model.encode([query])
-    
-    # Cosine similarity: dot product of normalized vectors
-    scores = np.dot(doc_embeddings, query_embedding.T).flatten()
-    
-    # Get top_k indices
-    top_indices = np.argsort(scores)[::-1][:top_k]
-    
-    return [docs[i] for i in top_indices]
+    per_exam = [_exam_queries(problems, multi_query) if problems else [] for problems in problem_lists]
+    unique = list(dict.fromkeys(q for queries in per_exam for q in queries))
+    if not unique:
+        return [[] for _ in problem_lists]
+
+    index, rankings = _search(unique, top_k, backend)
+    ranking_of = dict(zip(unique, rankings))
+
+    results = []
+    for queries in per_exam:
+        if not queries:
+            results.append([])
+        elif len(queries) == 1:
+            results.append([index.docs[i] for i in ranking_of[queries[0]]])
+        else:
+            fused = reciprocal_rank_fusion([ranking_of[q] for q in queries])
+            results.append([index.docs[i] for i in fused[:top_k]])
+    return results
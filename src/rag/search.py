@@ -0,0 +1,154 @@
+"""
+search.py — Pluggable vector-search backends for the RAG retriever.
+
+All backends work on L2-normalized vectors, so the dot product is the cosine
+similarity. Two backends are available:
+
+    exact  — brute-force scoring with an O(N) `argpartition` top-k selection.
+    ivf    — inverted-file index: documents are clustered with spherical k-means
+             and a query only scores the documents of its `n_probe` closest
+             clusters. More probes → higher recall, more latency.
+
+Select one with the `backend` argument of `retrieve_relevant_principles` or the
+RAG_SEARCH_BACKEND environment variable (RAG_IVF_NPROBE tunes the ivf backend).
+Knowledge bases smaller than IVF_MIN_DOCS are always searched exactly.
+"""
+
+import os
+
+import numpy as np
+
+DEFAULT_BACKEND = "exact"
+
+# Below this many documents the IVF backend just scans everything
+IVF_MIN_DOCS = 1024
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores in each row, best first."""
+    n = scores.shape[1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if k < n:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(n), (scores.shape[0], 1))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+class ExactSearch:
+    """Brute-force cosine search over the whole matrix."""
+
+    name = "exact"
+
+    def __init__(self, embeddings: np.ndarray):
+        self.embeddings = embeddings
+
+    def search(self, queries: np.ndarray, top_k: int) -> tuple:
+        """Return (indices, scores), each shaped (n_queries, top_k)."""
+        queries = np.atleast_2d(queries).astype(np.float32, copy=False)
+        scores = queries @ np.asarray(self.embeddings).T
+        idx = _top_k(scores, top_k)
+        return idx, np.take_along_axis(scores, idx, axis=1)
+
+
+class IVFSearch:
+    """
+    Inverted-file approximate search.
+
+    Args:
+        embeddings: normalized document matrix, shape (n_docs, dim).
+        n_lists:    number of k-means clusters (default ≈ sqrt(n_docs)).
+        n_probe:    clusters scanned per query; n_probe == n_lists is exact.
+        n_iter:     k-means iterations used when building the index.
+    """
+
+    name = "ivf"
+
+    def __init__(self, embeddings: np.ndarray, n_lists: int = None, n_probe: int = 8,
+                 n_iter: int = 10, seed: int = 0):
+        self.embeddings = np.asarray(embeddings, dtype=np.float32)
+        n_docs = self.embeddings.shape[0]
+        self.n_lists = max(1, min(n_lists or int(np.sqrt(n_docs)), n_docs))
+        self.n_probe = max(1, n_probe)
+        self.centroids, assignments = self._kmeans(n_iter, seed)
+
+        # Store each list as a contiguous slice of one permutation array
+        self._order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=self.n_lists)
+        self._offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def _assign(self, centroids: np.ndarray, batch: int = 8192) -> np.ndarray:
+        out = np.empty(self.embeddings.shape[0], dtype=np.int64)
+        for start in range(0, self.embeddings.shape[0], batch):
+            block = self.embeddings[start:start + batch]
+            out[start:start + batch] = np.argmax(block @ centroids.T, axis=1)
+        return out
+
+    def _kmeans(self, n_iter: int, seed: int) -> tuple:
+        rng = np.random.default_rng(seed)
+        init = rng.choice(self.embeddings.shape[0], size=self.n_lists, replace=False)
+        centroids = self.embeddings[init].copy()
+        assignments = self._assign(centroids)
+        for _ in range(n_iter):
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, self.embeddings)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Re-seed empty clusters from random documents
+            if empty.any():
+                sums[empty] = self.embeddings[rng.choice(self.embeddings.shape[0], size=int(empty.sum()))]
+                norms[empty] = 1.0
+            centroids = sums / norms
+            new_assignments = self._assign(centroids)
+            if np.array_equal(new_assignments, assignments):
+                break
+            assignments = new_assignments
+        return centroids, assignments
+
+    def search(self, queries: np.ndarray, top_k: int, n_probe: int = None) -> tuple:
+        """Return (indices, scores), each shaped (n_queries, top_k)."""
+        queries = np.atleast_2d(queries).astype(np.float32, copy=False)
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        probes = _top_k(queries @ self.centroids.T, n_probe)
+
+        all_idx = np.full((queries.shape[0], top_k), -1, dtype=np.int64)
+        all_scores = np.full((queries.shape[0], top_k), -np.inf, dtype=np.float32)
+        for qi, lists in enumerate(probes):
+            candidates = np.concatenate(
+                [self._order[self._offsets[l]:self._offsets[l + 1]] for l in lists]
+            )
+            scores = self.embeddings[candidates] @ queries[qi]
+            best = _top_k(scores[None, :], top_k)[0]
+            all_idx[qi, :len(best)] = candidates[best]
+            all_scores[qi, :len(best)] = scores[best]
+        return all_idx, all_scores
+
+
+def create_backend(embeddings: np.ndarray, name: str = None):
+    """Build a search backend by name ("exact" or "ivf")."""
+    name = (name or os.getenv("RAG_SEARCH_BACKEND") or DEFAULT_BACKEND).lower()
+    if name == "exact":
+        return ExactSearch(embeddings)
+    if name == "ivf":
+        if embeddings.shape[0] < IVF_MIN_DOCS:
+            print(f"   ⚠ ivf search needs at least {IVF_MIN_DOCS} documents "
+                  f"(have {embeddings.shape[0]}), using exact search")
+            return ExactSearch(embeddings)
+        n_probe = int(os.getenv("RAG_IVF_NPROBE", "8"))
+        return IVFSearch(embeddings, n_probe=n_probe)
+    raise ValueError(f"Unknown search backend: {name!r} (expected 'exact' or 'ivf')")
+
+
+def get_backend(index, name: str = None):
+    """Return the backend for an EmbeddingIndex, building it once per index (thread-safe)."""
+    name = (name or os.getenv("RAG_SEARCH_BACKEND") or DEFAULT_BACKEND).lower()
+    with index.backends_lock:
+        backend = index.backends.get(name)
+        if backend is None:
+            backend = create_backend(index.embeddings, name)
+            index.backends[name] = backend
+    return backend
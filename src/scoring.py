@@ -0,0 +1,171 @@
+"""
+scoring.py — Batch difficulty scoring for whole question banks.
+
+Reads questions from a CSV or JSON Lines file in fixed-size batches, cleans,
+vectorizes and predicts each batch in one call, and appends the difficulty
+label plus one probability column per class to the output file. Only one
+batch is held in memory at a time, so the input can be arbitrarily large.
+
+Each input row needs a `Title` and/or `Body` column; `Id` (or any columns
+passed as `keep_columns`) is copied through to the output. The output
+columns are fixed by the first batch, so JSON Lines input whose records
+have differing keys still lines up; a kept column first seen in a later
+batch is left out.
+
+Malformed CSV rows (more fields than the header) are skipped and counted
+in the summary as `skipped_rows`.
+"""
+
+import os
+import re
+import time
+import warnings
+
+import pandas as pd
+from pandas.errors import ParserWarning
+
+try:
+    from .model_registry import MODEL_DIR, get_model
+except ImportError:
+    from model_registry import MODEL_DIR, get_model
+
+BATCH_SIZE = 10_000
+TEXT_COLUMNS = ["Title", "Body"]
+DEFAULT_KEEP_COLUMNS = ["Id"]
+LABEL_COLUMN = "predicted_difficulty"
+PROBA_PREFIX = "prob_"
+
+
+def _file_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext == ".csv":
+        return "csv"
+    raise ValueError(f"Unsupported file type '{ext}' (expected .csv or .jsonl): {path}")
+
+
+_SKIPPED_LINE_RE = re.compile(r"^Skipping line \d+", re.MULTILINE)
+
+
+def _next_batch(reader, stats: dict):
+    """Next batch of `reader` (None at the end), counting the bad lines pandas skipped."""
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ParserWarning)
+        batch = next(reader, None)
+    for w in caught:
+        skipped = len(_SKIPPED_LINE_RE.findall(str(w.message))) if issubclass(w.category, ParserWarning) else 0
+        if skipped:
+            stats["skipped_rows"] = stats.get("skipped_rows", 0) + skipped
+        else:
+            warnings.warn_explicit(w.message, w.category, w.filename, w.lineno)
+    return batch
+
+
+def iter_question_batches(path: str, batch_size: int = BATCH_SIZE, stats: dict = None):
+    """
+    Yield DataFrame batches of at most `batch_size` rows from a CSV/JSONL file.
+
+    Malformed CSV rows are skipped; pass a `stats` dict to have their number
+    added to stats["skipped_rows"].
+    """
+    stats = {} if stats is None else stats
+    stats.setdefault("skipped_rows", 0)
+    if _file_format(path) == "jsonl":
+        reader = pd.read_json(path, lines=True, chunksize=batch_size, dtype=False)
+    else:
+        reader = pd.read_csv(path, encoding="latin1", chunksize=batch_size, on_bad_lines="warn")
+    with reader:
+        while (batch := _next_batch(reader, stats)) is not None:
+            yield batch
+
+
+def question_texts(batch: pd.DataFrame) -> pd.Series:
+    """Title + Body, as the classifier was trained on; missing columns count as empty."""
+    present = [c for c in TEXT_COLUMNS if c in batch.columns]
+    if not present:
+        raise ValueError(f"Input needs at least one of the columns {TEXT_COLUMNS}")
+    text = pd.Series("", index=batch.index)
+    for col in present:
+        text = text + " " + batch[col].fillna("").astype(str)
+    return text.str.strip()
+
+
+def score_batch(model, batch: pd.DataFrame, keep_columns=None) -> pd.DataFrame:
+    """Labels and class probabilities for one batch of questions."""
+    keep = [c for c in (keep_columns or DEFAULT_KEEP_COLUMNS) if c in batch.columns]
+    # One-off bulk pass: don't churn the interactive normalization cache
+    cleaned = model.clean(question_texts(batch), cache=False)
+    labels, proba = model.predict_with_proba(cleaned)
+
+    out = batch[keep].copy()
+    out[LABEL_COLUMN] = labels
+    for j, cls in enumerate(model.classes_):
+        out[f"{PROBA_PREFIX}{cls}"] = proba[:, j]
+    return out
+
+
+def _write_batch(scored: pd.DataFrame, output_path: str, fmt: str, first: bool):
+    mode = "w" if first else "a"
+    if fmt == "jsonl":
+        with open(output_path, mode, encoding="utf-8") as f:
+            scored.to_json(f, orient="records", lines=True, force_ascii=False)
+    else:
+        scored.to_csv(output_path, mode=mode, header=first, index=False)
+
+
+def score_file(input_path: str, output_path: str, model_dir: str = MODEL_DIR,
+               batch_size: int = BATCH_SIZE, keep_columns=None, verbose: bool = True) -> dict:
+    """
+    Score every question in `input_path` and write the results to `output_path`.
+
+    The output format follows the output file extension (.csv or .jsonl).
+    Returns a summary with the row count, skipped malformed rows, per-label
+    counts and timing.
+    """
+    model = get_model(model_dir)
+    out_fmt = _file_format(output_path)
+    out_dir = os.path.dirname(output_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    n_rows = 0
+    label_counts = {str(c): 0 for c in model.classes_}
+    read_stats = {}
+    columns = None
+    late_columns = set()   # kept columns first seen after the output header was written
+    for i, batch in enumerate(iter_question_batches(input_path, batch_size, read_stats)):
+        scored = score_batch(model, batch, keep_columns)
+        if columns is None:
+            columns = list(scored.columns)
+        else:
+            late_columns.update(c for c in scored.columns if c not in columns)
+            scored = scored.reindex(columns=columns)
+        _write_batch(scored, output_path, out_fmt, first=(i == 0))
+        n_rows += len(scored)
+        for label, count in scored[LABEL_COLUMN].value_counts().items():
+            label_counts[str(label)] = label_counts.get(str(label), 0) + int(count)
+        if verbose:
+            print(f"   Scored {n_rows:,} questions ({time.perf_counter() - start:.1f}s)")
+
+    if n_rows == 0:
+        # Still leave a (header-only) output behind for downstream jobs
+        empty = pd.DataFrame(columns=[LABEL_COLUMN] + [f"{PROBA_PREFIX}{c}" for c in model.classes_])
+        _write_batch(empty, output_path, out_fmt, first=True)
+
+    elapsed = time.perf_counter() - start
+    skipped_rows = read_stats.get("skipped_rows", 0)
+    if verbose and skipped_rows:
+        print(f"   ⚠ Skipped {skipped_rows:,} malformed row(s) in {input_path}")
+    if verbose and late_columns:
+        print(f"   ⚠ Columns missing from the first batch were not written: {sorted(late_columns)}")
+    return {
+        "rows": n_rows,
+        "skipped_rows": skipped_rows,
+        "label_counts": label_counts,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(n_rows / elapsed, 1) if elapsed > 0 else None,
+        "model_version": model.version,
+        "model_backend": model.backend,
+    }
@@ -1,9 +1,15 @@
 # text_cleaner.py
 
 # basic libs
+import os
 import pandas as pd
 import re
-from bs4 import BeautifulSoup 
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .html_text import html_to_text
+except ImportError:
+    from html_text import html_to_text
 
 
 # 1) Load tags from the csv we created (unique_tags.csv)
@@ -23,11 +29,13 @@ def load_tags(tag_csv_path="../data/processed/unique_tags.csv"):
     )
 
     # we will temporarily replace tags with placeholders
-    # example: python -> TAGTOKEN0
+    # example: python -> TAGTOKEN0Q
+    # (the trailing Q ends the placeholder, so "c++11" -> "TAGTOKEN3Q11"
+    # still restores as c++ followed by 11)
     tag_placeholder_map = {}
 
     for i, tag in enumerate(tags):
-        tag_placeholder_map[tag] = f"TAGTOKEN{i}"
+        tag_placeholder_map[tag] = f"TAGTOKEN{i}Q"
 
     # reverse map to bring tags back later
     reverse_map = {v: k for k, v in tag_placeholder_map.items()}
@@ -38,17 +46,71 @@ def load_tags(tag_csv_path="../data/processed/unique_tags.csv"):
 
 # 2) Remove HTML from stackoverflow posts
 # (because Body column has <p> <code> <a> etc)
+# streaming extractor, same text as BeautifulSoup(...).get_text(" ") without the tree
 
 def remove_html(text):
     if pd.isna(text):
         return ""
 
-    soup = BeautifulSoup(str(text), "html.parser")
-    return soup.get_text(separator=" ")
+    return html_to_text(str(text), separator=" ")
 
 
 # 3) Protect tags BEFORE cleaning
 # otherwise cleaning destroys stuff like c++, c#, node.js
+#
+# all tags are compiled into ONE trie-shaped regex (once per tag map),
+# so each document is scanned a single time instead of once per tag
+
+_PLACEHOLDER_RE = re.compile(r"TAGTOKEN\d+Q")
+
+# compiled pattern per tag map: id(map) -> (map, pattern, len(map))
+# (we keep the map itself so its id can't be reused while cached,
+# and its length so a map that grew is recompiled)
+_TAG_PATTERN_CACHE = {}
+_TAG_PATTERN_CACHE_SIZE = 8
+
+
+def _trie_regex(words):
+    # build a trie: {"c": {"": True, "+": {"+": {"": True}}, "#": {"": True}}}
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def to_regex(node):
+        is_end = "" in node
+        branches = [re.escape(ch) + to_regex(child)
+                    for ch, child in sorted(node.items()) if ch != ""]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        # greedy "?" tries the longer tag first, then falls back to this prefix
+        return body + "?" if is_end else body
+
+    return to_regex(trie)
+
+
+def compile_tag_pattern(tag_placeholder_map):
+    tags = [tag for tag in tag_placeholder_map if tag]
+    if not tags:
+        return None
+    return re.compile(rf"\b(?:{_trie_regex(tags)})\b")
+
+
+def _get_tag_pattern(tag_placeholder_map):
+    key = id(tag_placeholder_map)
+    cached = _TAG_PATTERN_CACHE.get(key)
+    if cached is None or cached[0] is not tag_placeholder_map or cached[2] != len(tag_placeholder_map):
+        if len(_TAG_PATTERN_CACHE) >= _TAG_PATTERN_CACHE_SIZE:
+            _TAG_PATTERN_CACHE.clear()
+        cached = (tag_placeholder_map, compile_tag_pattern(tag_placeholder_map), len(tag_placeholder_map))
+        _TAG_PATTERN_CACHE[key] = cached
+    return cached[1]
+
 
 def protect_tags(text, tag_placeholder_map):
     if pd.isna(text):
@@ -56,11 +118,12 @@ def protect_tags(text, tag_placeholder_map):
 
     text = text.lower()
 
-    # replace each tag with placeholder
-    for tag, placeholder in tag_placeholder_map.items():
-        text = re.sub(rf"\b{re.escape(tag)}\b", placeholder, text)
+    # replace every tag with its placeholder in one pass
+    pattern = _get_tag_pattern(tag_placeholder_map)
+    if pattern is None:
+        return text
 
-    return text
+    return pattern.sub(lambda m: tag_placeholder_map[m.group(0)], text)
 
 
 # 4) Actual text cleaning
@@ -77,13 +140,12 @@ def clean_text(text):
 
 
 # 5) Bring tags back after cleaning
-# TAGTOKEN0 -> python
+# TAGTOKEN0Q -> python
+# (one regex pass, so TAGTOKEN1Q never eats the start of TAGTOKEN10Q,
+# and digits right after a placeholder are left alone)
 
 def restore_tags(text, reverse_map):
-    for placeholder, tag in reverse_map.items():
-        text = text.replace(placeholder, tag)
-
-    return text
+    return _PLACEHOLDER_RE.sub(lambda m: reverse_map.get(m.group(0), m.group(0)), text)
 
 
 # 6) THE MAIN FUNCTION (this is what teammates will use)
@@ -108,16 +170,50 @@ def cleanText(text, tag_placeholder_map, reverse_map):
 
 # 7) Apply to whole dataframe column
 # works for BOTH Questions and Answers dataset
+#
+# n_jobs > 1 splits the column into chunks and cleans them on a process pool.
+# the tag maps are sent to each worker ONCE (initializer), not once per row,
+# and results come back in the original row order.
+
+_worker_tag_map = None
+_worker_reverse_map = None
+
+
+def _init_clean_worker(tag_placeholder_map, reverse_map):
+    global _worker_tag_map, _worker_reverse_map
+    _worker_tag_map = tag_placeholder_map
+    _worker_reverse_map = reverse_map
 
-def clean_dataframe(df, column_name, tag_csv_path="../data/processed/unique_tags.csv"):
+
+def _clean_chunk(values):
+    return [cleanText(x, _worker_tag_map, _worker_reverse_map) for x in values]
+
+
+def clean_dataframe(df, column_name, tag_csv_path="../data/processed/unique_tags.csv",
+                    n_jobs=1, chunksize=5000):
 
     # load tags + placeholder mapping
     tag_placeholder_map, reverse_map = load_tags(tag_csv_path)
 
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+
+    values = df[column_name].tolist()
+
+    if not n_jobs or n_jobs == 1 or len(values) <= chunksize:
+        cleaned = [cleanText(x, tag_placeholder_map, reverse_map) for x in values]
+    else:
+        chunks = [values[i:i + chunksize] for i in range(0, len(values), chunksize)]
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_clean_worker,
+            initargs=(tag_placeholder_map, reverse_map),
+        ) as pool:
+            # map() yields chunks in submission order -> deterministic output
+            cleaned = [text for chunk in pool.map(_clean_chunk, chunks) for text in chunk]
+
     # create new cleaned column
     # example: Body -> Body_cleaned
-    df[column_name + "_cleaned"] = df[column_name].apply(
-        lambda x: cleanText(x, tag_placeholder_map, reverse_map)
-    )
+    df[column_name + "_cleaned"] = pd.Series(cleaned, index=df.index, dtype=object)
 
-    return df
\ No newline at end of file
+    return df
@@ -0,0 +1,70 @@
+"""
+The sampled training corpus must not depend on how it was read: streamed
+in any chunk size, served from the Parquet cache built by an earlier run,
+or loaded in one piece without the cache.
+"""
+
+import csv
+import random
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn")
+pytest.importorskip("pyarrow")
+
+import generate_models as gm
+
+N_QUESTIONS = 600
+
+
+@pytest.fixture
+def raw_corpus(tmp_path, monkeypatch):
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    rng = random.Random(0)
+    with open(raw_dir / "Questions.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Id", "OwnerUserId", "CreationDate", "Score", "Title", "Body"])
+        for qid in range(1, N_QUESTIONS + 1):
+            body = "<p></p>" if qid % 11 == 0 else f"<p>how do I {rng.choice(['sort', 'parse', 'join'])} it</p>"
+            writer.writerow([qid, 1, "2010-01-01", 1, "" if qid % 11 == 0 else "Question", body])
+    with open(raw_dir / "Answers.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Id", "OwnerUserId", "CreationDate", "ParentId", "Score", "Body"])
+        for qid in range(1, N_QUESTIONS + 1):
+            # mostly low scores (Hard), some Medium and Easy ones and one outlier
+            score = 1000 if qid == 1 else rng.choice([0] * 6 + [30] * 2 + [60])
+            writer.writerow([qid, 1, "2010-01-01", qid, score, "answer"])
+
+    monkeypatch.setattr(gm, "RAW_DIR", str(raw_dir))
+    monkeypatch.setattr(gm, "CACHE_DIR", str(tmp_path / "cache"))
+    return raw_dir
+
+
+def _sample(chunksize, use_cache):
+    chunks, _ = gm.open_corpus(chunksize, use_cache)
+    return gm.load_training_corpus(chunks).sort_values("Id").reset_index(drop=True)
+
+
+def test_cache_hit_and_miss_give_the_same_sample(raw_corpus, tmp_path):
+    uncached = _sample(None, use_cache=False)
+    assert set(uncached["difficulty"]) == {"Easy", "Medium", "Hard"}
+
+    miss = _sample(7, use_cache=True)       # builds the cache with 7-row row groups
+    assert list((tmp_path / "cache").glob("corpus-*.parquet"))
+    hit = _sample(None, use_cache=True)     # later plain run reads that cache
+
+    columns = ["Id", "clean_text", "difficulty"]
+    for sample in (miss, hit):
+        # the Parquet round trip may change string dtypes, never values
+        pd.testing.assert_frame_equal(sample[columns], uncached[columns], check_dtype=False)
+
+
+def test_sample_keeps_every_class(raw_corpus):
+    chunks, _ = gm.open_corpus(None, use_cache=False)
+    corpus = gm.load_training_corpus(chunks, sample_frac=1.0)
+    sample = _sample(3, use_cache=False)
+    for label, count in corpus["difficulty"].value_counts().items():
+        kept = (sample["difficulty"] == label).sum()
+        assert 0 < kept < count
@@ -0,0 +1,75 @@
+"""
+Parity of src/html_text.py with BeautifulSoup's html.parser text extraction.
+
+html_to_text(x, sep) must return exactly what
+BeautifulSoup(x, "html.parser").get_text(sep) returns.
+"""
+
+import random
+
+import pytest
+
+from html_text import html_to_text
+
+bs4 = pytest.importorskip("bs4")
+
+
+def soup_text(html: str, separator: str) -> str:
+    return bs4.BeautifulSoup(html, "html.parser").get_text(separator)
+
+
+CASES = {
+    "plain_text": "just some words, no markup",
+    "paragraphs": "<p>First line</p><p>Second</p><ul><li>alpha</li><li>beta</li></ul>line<br>break",
+    "inline_code": "<p>Call <code>foo(x)</code> then <code>bar()</code>.</p>",
+    "pre_block": "<pre><code>def f(x):\n    return x  # keep\n\n\tindented\n</code></pre><p>after</p>",
+    "pre_whitespace_only": "<pre>   \n  </pre><p> </p><div>\n\n</div>",
+    "nested_code_in_pre": "<pre class='lang-py'><code>a &lt; b &amp;&amp; c &gt; d</code></pre>",
+    "named_entities": "<p>&lt;tag&gt; &amp; &quot;quoted&quot; &apos;x&apos; &copy; &nbsp;space</p>",
+    "numeric_entities": "<p>&#39;single&#39; &#x27;hex&#x27; &#8212; dash &#169;</p>",
+    "unknown_entity": "<p>&notanentity; &amp stray &</p>",
+    "script_style": "<p>before</p><script>var x = '<p>not text</p>';</script>"
+                     "<style>p { color: red; }</style><p>after</p>",
+    "script_uppercase": "<SCRIPT type='text/javascript'>alert(1)</SCRIPT>visible",
+    "cdata": "<p>x</p><![CDATA[raw <b>cdata</b> & text]]><p>y</p>",
+    "comments_doctype": "<!DOCTYPE html><!-- hidden --><p>shown</p><?xml version='1.0'?>tail",
+    "unclosed_tags": "<p>open <b>bold <i>italic<p>next paragraph",
+    "stray_brackets": "a < b and c > d <<< >>> </ >",
+    "broken_attributes": "<a href='x title=y>link</a> text <img src=\"a.png\" alt='b'>",
+    "void_and_self_closing": "one<br/>two<hr />three<img src=x>four",
+    "mismatched_close": "<div><span>a</div></span>b</p>c",
+    "pre_closed_by_parent": "<div><pre>  x  </div>  \n  <p> </p>",
+    "stray_pre_close": "<textarea>  \n </pre>  </textarea>",
+    "ruby_template": "<ruby>漢<rp>(</rp><rt>kan</rt><rp>)</rp></ruby><template><b>t</b></template>end",
+    "whitespace_runs": "<p>a</p>\n\n   <p>b</p>   <p>c</p>",
+    "unicode": "<p>naïve café — 日本語 😀</p>",
+}
+
+
+@pytest.mark.parametrize("separator", ["", " ", "\n"])
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_matches_beautifulsoup(name, separator):
+    html = CASES[name]
+    assert html_to_text(html, separator) == soup_text(html, separator)
+
+
+def test_empty_input():
+    assert html_to_text("", " ") == ""
+
+
+# random soups of the fragments above, to catch the interactions the cases miss
+FRAGMENTS = [
+    "<p>", "</p>", "<pre>", "</pre>", "<code>", "</code>", "<script>", "</script>",
+    "<style>", "</style>", "<textarea>", "</textarea>", "<br>", "<br/>", "<img src=x>",
+    "<!-- c -->", "<!--", "-->", "<![CDATA[x]]>", "<!DOCTYPE html>", "<?pi?>", "<!>",
+    "<", ">", "</", "</ >", "&", "&amp;", "&amp", "&lt", "&notin;", "&notit;", "&AMP;",
+    "&#39;", "&#x27;", "&#150;", "&#0;", "&#xD800;", "&#", "&#12a", " ", "\n", "\t",
+    "  \n ", "word", "a<b", "<a href='q'>", "</a>", "<div class=\"", "\">", "日本",
+]
+
+
+def test_random_markup_matches_beautifulsoup():
+    rng = random.Random(0)
+    for _ in range(2000):
+        html = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 25)))
+        assert html_to_text(html, " ") == soup_text(html, " "), html
@@ -0,0 +1,56 @@
+"""
+Streaming upload ingestion: the aggregates must match a full pandas read,
+response rows must not be kept, and unused columns are reported.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingest import PREVIEW_ROWS, read_questions, read_responses
+
+
+@pytest.fixture
+def responses_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 5_000
+    df = pd.DataFrame({
+        "Id": np.arange(n),
+        "ParentId": rng.integers(0, 50, n),
+        "Score": rng.integers(-20, 80, n).astype(object),
+        "Body": "answer text",
+        "Extra": "unused",
+    })
+    df.loc[7, "Score"] = "n/a"   # coerced to NaN, never fails the upload
+    path = tmp_path / "responses.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_responses_are_summarized_not_kept(responses_csv):
+    result = read_responses(responses_csv, chunksize=700)
+    full = pd.read_csv(responses_csv)
+    full["Score"] = pd.to_numeric(full["Score"], errors="coerce")
+
+    assert result.df is None
+    assert result.rows == len(full)
+    assert len(result.preview) == PREVIEW_ROWS
+    assert result.dropped_columns == ["Body", "Extra"]
+
+    assert result.stats["Score"].count == full["Score"].count()
+    assert result.stats["Score"].mean == pytest.approx(full["Score"].mean())
+
+    hist = result.histograms["Score"]
+    expected = np.histogram(full["Score"].dropna().clip(hist.edges[0], hist.edges[-1]), bins=hist.edges)[0]
+    assert (hist.counts == expected).all()
+
+    per_q = result.per_question.set_index("ParentId").sort_index()
+    grouped = full.groupby("ParentId")["Score"].agg(["mean", "count", "std"])
+    assert np.allclose(per_q[["mean", "count", "std"]].to_numpy(), grouped.to_numpy())
+
+
+def test_questions_keep_rows_of_used_columns(responses_csv):
+    result = read_questions(responses_csv, chunksize=700)
+    assert len(result.df) == result.rows == 5_000
+    assert list(result.df.columns) == ["Id", "Score", "Body"]
+    assert result.dropped_columns == ["ParentId", "Extra"]
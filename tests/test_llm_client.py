@@ -0,0 +1,218 @@
+"""
+The LLM client against an in-process stub of the chat completions API:
+transient failures are retried within the deadline, other failures and
+exhausted deadlines raise LLMUnavailable, and the circuit breaker opens,
+lets one trial call through and closes again.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("groq")
+
+from agents import llm_client as llm
+from agents.llm_client import CircuitBreaker, LLMUnavailable
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        reply = self.server.next_reply()
+        time.sleep(reply.get("delay", 0))
+        try:
+            if reply.get("status", 200) != 200:
+                self._send_json(reply["status"], {"error": {"message": "stub error"}}, reply.get("headers", {}))
+            elif body.get("stream"):
+                self._send_stream(body["model"], reply.get("chunks", [(0, "ok")]))
+            else:
+                message = {"role": "assistant", "content": reply.get("text", "ok")}
+                self._send_json(200, {
+                    "id": "stub", "object": "chat.completion", "created": 0, "model": body["model"],
+                    "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+                })
+        except (BrokenPipeError, ConnectionResetError):
+            pass    # the client gave up on this attempt
+
+    def _send_json(self, status, payload, headers=()):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in dict(headers).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, model, chunks):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = []
+        for delay, text in chunks:
+            event = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": model,
+                     "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]}
+            events.append((delay, f"data: {json.dumps(event)}\n\n".encode()))
+        events.append((0, b"data: [DONE]\n\n"))
+        for delay, data in events:
+            time.sleep(delay)
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class StubServer(ThreadingHTTPServer):
+    """Answers each request with the next scripted reply, then with plain successes."""
+
+    daemon_threads = True
+    block_on_close = False
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.replies = []
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def next_reply(self) -> dict:
+        with self._lock:
+            self.requests += 1
+            return self.replies.pop(0) if self.replies else {}
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = StubServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("GROQ_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setenv("GROQ_API_KEY", "stub-key")
+    # fresh clients pointed at the stub, small budgets and a fresh breaker
+    monkeypatch.setattr(llm, "_sync_client", None)
+    monkeypatch.setattr(llm, "_async_clients", {})
+    monkeypatch.setattr(llm, "ATTEMPT_TIMEOUT", 0.5)
+    monkeypatch.setattr(llm, "MAX_RETRIES", 2)
+    monkeypatch.setattr(llm, "RETRY_BASE", 0.01)
+    monkeypatch.setattr(llm, "breaker", CircuitBreaker(failure_threshold=2, cooldown=0.3))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_retries_server_errors(stub):
+    stub.replies = [{"status": 503}, {"status": 500}, {"text": "third time"}]
+    assert llm.complete("q", timeout=5) == "third time"
+    assert stub.requests == 3
+
+
+def test_gives_up_after_max_retries(stub):
+    stub.replies = [{"status": 503}] * 3
+    with pytest.raises(LLMUnavailable, match="InternalServerError"):
+        llm.complete("q", timeout=5)
+    assert stub.requests == 3
+
+
+def test_rate_limit_honours_retry_after(stub):
+    stub.replies = [{"status": 429, "headers": {"Retry-After": "0.4"}}, {"text": "after wait"}]
+    started = time.monotonic()
+    assert asyncio.run(llm.acomplete("q", timeout=5)) == "after wait"
+    assert time.monotonic() - started >= 0.4
+    assert stub.requests == 2
+
+
+def test_client_errors_are_not_retried(stub):
+    stub.replies = [{"status": 400}]
+    with pytest.raises(LLMUnavailable, match="BadRequestError"):
+        llm.complete("q", timeout=5)
+    assert stub.requests == 1
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_slow_attempt_is_retried(stub, use_async):
+    stub.replies = [{"delay": 2}, {"text": "fast"}]
+    started = time.monotonic()
+    if use_async:
+        text = asyncio.run(llm.acomplete("q", timeout=5))
+    else:
+        text = llm.complete("q", timeout=5)
+    assert text == "fast"
+    assert time.monotonic() - started < 1.5    # the first attempt was cut at 0.5 s
+    assert stub.requests == 2
+
+
+def test_overall_deadline_bounds_all_attempts(stub, monkeypatch):
+    monkeypatch.setattr(llm, "MAX_RETRIES", 10)
+    stub.replies = [{"delay": 3}] * 10
+    started = time.monotonic()
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(llm.acomplete("q", timeout=1.2))
+    assert time.monotonic() - started < 2
+    assert 2 <= stub.requests <= 4
+
+
+def test_breaker_opens_then_half_open_trial_closes_it(stub):
+    stub.replies = [{"status": 400}, {"status": 400}]
+    for _ in range(2):
+        with pytest.raises(LLMUnavailable):
+            llm.complete("q")
+    assert llm.breaker.state == "open"
+
+    with pytest.raises(LLMUnavailable, match="circuit open"):
+        llm.complete("q")
+    assert stub.requests == 2          # failed fast without calling the provider
+
+    time.sleep(0.35)
+    assert llm.complete("q") == "ok"   # the trial call after the cooldown
+    assert llm.breaker.state == "closed"
+    assert stub.requests == 3
+
+
+def test_failed_half_open_trial_reopens_the_circuit(stub):
+    stub.replies = [{"status": 400}] * 3
+    for _ in range(2):
+        with pytest.raises(LLMUnavailable):
+            llm.complete("q")
+    time.sleep(0.35)
+    with pytest.raises(LLMUnavailable, match="BadRequestError"):
+        llm.complete("q")
+    assert llm.breaker.state == "open"
+    with pytest.raises(LLMUnavailable, match="circuit open"):
+        llm.complete("q")
+    assert stub.requests == 3
+
+
+async def _collect(stream) -> list:
+    return [text async for text in stream]
+
+
+def test_stream_gaps_may_exceed_the_attempt_timeout(stub):
+    # only the first chunk must arrive within the 0.5 s attempt budget
+    stub.replies = [{"chunks": [(0, "1."), (0.8, " slow"), (0.8, " answer")]}]
+    chunks = asyncio.run(_collect(llm.astream("q", timeout=5)))
+    assert "".join(chunks) == "1. slow answer"
+    assert stub.requests == 1
+
+
+def test_slow_first_chunk_is_retried(stub):
+    stub.replies = [{"chunks": [(2, "late")]}, {"chunks": [(0, "on time")]}]
+    started = time.monotonic()
+    assert asyncio.run(_collect(llm.astream("q", timeout=5))) == ["on time"]
+    assert time.monotonic() - started < 1.5
+    assert stub.requests == 2
+
+
+def test_stream_is_cut_at_the_overall_deadline(stub):
+    stub.replies = [{"chunks": [(0, "1."), (3, " never")]}]
+    started = time.monotonic()
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(_collect(llm.astream("q", timeout=1.5)))
+    assert time.monotonic() - started < 2.5
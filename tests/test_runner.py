@@ -0,0 +1,77 @@
+"""
+The dependency runner starts every stage whose inputs are available, so
+independent stages overlap and dependent ones see their inputs.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from agents.graph import PIPELINE_STAGES
+from agents.runner import PipelineError, PipelineRunner, Stage, run_sync
+
+
+def _meet(barrier: threading.Barrier, key: str):
+    def stage(state):
+        # Both stages must be inside at the same time, or this times out
+        barrier.wait(timeout=5)
+        state[key] = True
+        return state
+    return stage
+
+
+def test_independent_sync_stages_run_concurrently():
+    barrier = threading.Barrier(2)
+    seen = {}
+
+    def join(state):
+        seen.update(state)
+        state["joined"] = state["a"] and state["b"]
+        return state
+
+    runner = PipelineRunner([
+        Stage("a", _meet(barrier, "a"), inputs=("x",), outputs=("a",)),
+        Stage("b", _meet(barrier, "b"), inputs=("x",), outputs=("b",)),
+        Stage("join", join, inputs=("a", "b"), outputs=("joined",)),
+    ])
+    state = run_sync(runner.run({"x": 1}))
+    assert state["joined"] is True
+    assert seen["a"] and seen["b"]
+
+
+def test_sync_and_async_stages_overlap():
+    started = threading.Event()
+
+    def blocking(state):
+        started.set()
+        state["blocking"] = True
+        return state
+
+    async def waits_for_blocking(state):
+        # Runs on the loop while the blocking stage is in its worker thread
+        await asyncio.wait_for(asyncio.to_thread(started.wait, 5), timeout=6)
+        state["async"] = started.is_set()
+        return state
+
+    runner = PipelineRunner([
+        Stage("blocking", blocking, outputs=("blocking",)),
+        Stage("async", waits_for_blocking, outputs=("async",)),
+    ])
+    state = run_sync(runner.run({}))
+    assert state["async"] is True
+
+
+def test_failing_stage_cancels_the_run():
+    def broken(state):
+        raise ValueError("boom")
+
+    runner = PipelineRunner([Stage("broken", broken, outputs=("y",))])
+    with pytest.raises(PipelineError, match="broken"):
+        run_sync(runner.run({}))
+
+
+def test_pipeline_warm_up_is_independent_of_the_analyzer():
+    initial = {"difficulty", "topic_analysis", "metadata"}
+    ready_at_start = {s.name for s in PIPELINE_STAGES if set(s.inputs) <= initial}
+    assert {"warm_up", "analyzer", "topic_text"} <= ready_at_start